@@ -6,11 +6,17 @@ Description: This package is heavily inspired by Google's Magenta note-seq. Basi
 Copyright (c) 2024, Matteo Pettenò
 License: Apache License 2.0 (https://www.apache.org/licenses/LICENSE-2.0)
 """
-from . import constants
-from . import exceptions
-from . import io
-from . import attributes
-from . import processors
-from . import representations
-from . import statistics
-from . import utilities
+from .lazy import lazy_submodules
+
+# Submodules are imported lazily on first access (PEP 562), so that using a single module (e.g. chord_symbols) does
+# not pay for importing the whole package (e.g. pretty_midi and the MusicXML parser in io).
+__getattr__, __dir__ = lazy_submodules(globals(), (
+    'constants',
+    'exceptions',
+    'io',
+    'attributes',
+    'processors',
+    'representations',
+    'statistics',
+    'utilities'
+))
@@ -5,18 +5,60 @@ Description: Package providing functions to compute metrics relative to a NoteSe
 Copyright (c) 2024, Matteo Pettenò
 License: Apache License 2.0 (https://www.apache.org/licenses/LICENSE-2.0)
 """
-import functools
+import inspect
+from typing import Dict, Any, List
 
+from . import common
 from . import dynamics
 from . import pitch
 from . import rhythmic
+from .. import constants
 
 from resolv_mir.protobuf import NoteSequence
 
 
 def compute_attribute(note_sequence: NoteSequence, attribute_name: str, **kwargs) -> float:
-    attribute_fn = ATTRIBUTE_FN_MAP[attribute_name]
-    return attribute_fn(note_sequence=note_sequence, **kwargs)
+    return ATTRIBUTE_FN_MAP[attribute_name](note_sequence, **kwargs)
+
+
+def compute_attributes_batch(note_sequence: NoteSequence, attribute_names: List[str] = None,
+                             **attributes_kwargs: Dict[str, Any]) -> Dict[str, float]:
+    """ Compute several attributes of a NoteSequence proto at once.
+
+    Attribute functions are resolved once and then called in a single loop, which avoids the per-attribute dispatch
+    of repeated compute_attribute calls. The attributes share a single AttributesContext, so the notes are read from
+    the proto once for all of them.
+
+    Args:
+        note_sequence (NoteSequence): The input NoteSequence proto.
+        attribute_names (List[str], optional): The names of the attributes to compute. If None, all the attributes in
+            ATTRIBUTE_FN_MAP are computed.
+        **attributes_kwargs (Dict[str, Any]): Keyword arguments for specific attributes, given as a dictionary keyed
+            by attribute name (e.g. toussaint={'bars': 4}).
+
+    Returns:
+        (Dict[str, float]): A dictionary mapping each attribute name to its value.
+    """
+    if attribute_names is None:
+        attribute_names = list(ATTRIBUTE_FN_MAP)
+    context = common.AttributesContext(note_sequence)
+    attributes = {}
+    for name in attribute_names:
+        kwargs = attributes_kwargs.get(name) or {}
+        if name in _CONTEXT_ATTRIBUTES:
+            kwargs = {**kwargs, 'context': context}
+        attributes[name] = ATTRIBUTE_FN_MAP[name](note_sequence, **kwargs)
+    return attributes
+
+
+def _ratio_unique_bigrams(note_sequence: NoteSequence, num_midi_pitches: int = constants.NUM_PIANO_MIDI_PITCHES,
+                          context: common.AttributesContext = None) -> float:
+    return pitch.ratio_unique_ngrams(note_sequence, n=2, num_midi_pitches=num_midi_pitches, context=context)
+
+
+def _ratio_unique_trigrams(note_sequence: NoteSequence, num_midi_pitches: int = constants.NUM_PIANO_MIDI_PITCHES,
+                           context: common.AttributesContext = None) -> float:
+    return pitch.ratio_unique_ngrams(note_sequence, n=3, num_midi_pitches=num_midi_pitches, context=context)
 
 
 ATTRIBUTE_FN_MAP = {
@@ -25,8 +67,8 @@ ATTRIBUTE_FN_MAP = {
     'pitch_range': pitch.pitch_range,
     'contour': pitch.contour,
     'unique_notes_ratio': pitch.ratio_unique_notes,
-    'unique_bigrams_ratio': functools.partial(pitch.ratio_unique_ngrams, n=2),
-    'unique_trigrams_ratio': functools.partial(pitch.ratio_unique_ngrams, n=3),
+    'unique_bigrams_ratio': _ratio_unique_bigrams,
+    'unique_trigrams_ratio': _ratio_unique_trigrams,
     'dynamic_range': dynamics.dynamic_range,
     'note_change_ratio': dynamics.ratio_note_change,
     'ratio_note_off_steps': dynamics.ratio_note_off_steps,
@@ -34,3 +76,7 @@ ATTRIBUTE_FN_MAP = {
     'repetitive_section_ratio': dynamics.ratio_repetitive_sections,
     'len_longest_rep_section': dynamics.length_longest_repetitive_section
 }
+
+# Attributes whose function accepts a shared AttributesContext
+_CONTEXT_ATTRIBUTES = frozenset(name for name, attribute_fn in ATTRIBUTE_FN_MAP.items()
+                                if 'context' in inspect.signature(attribute_fn).parameters)
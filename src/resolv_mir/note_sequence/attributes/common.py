@@ -1,10 +1,85 @@
 """ This module provides common operations used by the other modules to compute the attributes. """
-from typing import Union
+import functools
+import operator
+from typing import List, Union
 
-from .. import utilities
+import numpy as np
+
+from .. import constants, utilities
 from resolv_mir.protobuf import NoteSequence
 
 
+class AttributesContext(object):
+    """ Per-sequence data shared by the attribute functions.
+
+    Attributes of a NoteSequence proto are usually computed together. The context reads each note field into a numpy
+    array the first time it is needed and keeps it, so that computing several attributes traverses the proto only once
+    per field. The notes themselves are listed once and shared by all the field reads, so the proto wrapper of each
+    note is only built once.
+    """
+
+    def __init__(self, note_sequence: NoteSequence):
+        """ Construct an AttributesContext.
+
+        Args:
+            note_sequence (NoteSequence): The NoteSequence proto the attributes are computed on.
+        """
+        self.note_sequence = note_sequence
+
+    @functools.cached_property
+    def is_quantized(self) -> bool:
+        return utilities.is_quantized_sequence(self.note_sequence)
+
+    @functools.cached_property
+    def normalization_factor(self) -> Union[int, float]:
+        return self.note_sequence.total_quantized_steps if self.is_quantized else self.note_sequence.total_time
+
+    @functools.cached_property
+    def notes(self) -> List[NoteSequence.Note]:
+        return list(self.note_sequence.notes)
+
+    @functools.cached_property
+    def start_times(self) -> np.ndarray:
+        return self._note_field_array('start_time', np.float64)
+
+    @functools.cached_property
+    def onsets_count(self) -> int:
+        # Number of distinct note start times, compared with the same tolerance of utilities.float_equal
+        start_times = np.sort(self.start_times)
+        if not start_times.size:
+            return 0
+        previous_times, next_times = start_times[:-1], start_times[1:]
+        tolerance = np.maximum(constants.FLOAT_RELATIVE_TOLERANCE * np.maximum(np.abs(previous_times),
+                                                                              np.abs(next_times)),
+                               constants.FLOAT_ABSOLUTE_TOLERANCE)
+        return 1 + int(np.count_nonzero(next_times - previous_times > tolerance))
+
+    @functools.cached_property
+    def start_time_order(self) -> np.ndarray:
+        # Stable, so notes starting together keep their order in the sequence
+        return np.argsort(self.start_times, kind='stable')
+
+    @functools.cached_property
+    def start_steps(self) -> np.ndarray:
+        return self._note_field_array('quantized_start_step', np.int64)
+
+    @functools.cached_property
+    def end_steps(self) -> np.ndarray:
+        return self._note_field_array('quantized_end_step', np.int64)
+
+    @functools.cached_property
+    def pitches(self) -> np.ndarray:
+        return self._note_field_array('pitch', np.int32)
+
+    @functools.cached_property
+    def velocities(self) -> np.ndarray:
+        return self._note_field_array('velocity', np.int32)
+
+    def _note_field_array(self, field_name: str, dtype: np.dtype) -> np.ndarray:
+        notes = self.notes
+        return np.fromiter(map(operator.attrgetter(field_name), notes), dtype=dtype, count=len(notes))
+
+
 def get_attribute_normalization_factor(note_sequence: NoteSequence) -> Union[int, float]:
     """ Get the normalization factor for attribute evaluation.
 
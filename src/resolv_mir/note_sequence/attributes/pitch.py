@@ -1,6 +1,4 @@
 """ This module contains functions to compute attributes regarding the pitch of a NoteSequence proto. """
-from math import perm
-
 import numpy as np
 
 from . import common
@@ -8,7 +6,8 @@ from .. import constants, processors, utilities
 from ...protobuf import NoteSequence
 
 
-def pitch_range(note_sequence: NoteSequence, num_midi_pitches: int = constants.NUM_PIANO_MIDI_PITCHES) -> float:
+def pitch_range(note_sequence: NoteSequence, num_midi_pitches: int = constants.NUM_PIANO_MIDI_PITCHES,
+                context: common.AttributesContext = None) -> float:
     """ Compute the pitch range of a NoteSequence proto.
 
     The pitch range is defined as the ratio of the difference between the highest and lowest pitch to the total number
@@ -17,18 +16,21 @@ def pitch_range(note_sequence: NoteSequence, num_midi_pitches: int = constants.N
     Args:
         note_sequence (NoteSequence): The input NoteSequence proto.
         num_midi_pitches (int, optional): The total number of MIDI pitches to consider. Defaults to 88 (piano range).
+        context (AttributesContext, optional): A context holding the data of note_sequence shared among attributes. If
+            None, a new one is built.
 
     Returns:
         (float): The pitch range of the NoteSequence.
     """
     if not note_sequence.notes:
         return 0.0
-    pitch_list = utilities.get_pitch_list(note_sequence)
+    pitch_list = (context or common.AttributesContext(note_sequence)).pitches
     metric = (np.max(pitch_list) - np.min(pitch_list)) / num_midi_pitches
     return metric
 
 
-def contour(note_sequence: NoteSequence, num_midi_pitches: int = constants.NUM_PIANO_MIDI_PITCHES) -> float:
+def contour(note_sequence: NoteSequence, num_midi_pitches: int = constants.NUM_PIANO_MIDI_PITCHES,
+            context: common.AttributesContext = None) -> float:
     """ Compute the contour of a NoteSequence proto.
 
     The contour is defined as the ratio of the sum of the absolute differences between adjacent pitches to the total
@@ -37,18 +39,23 @@ def contour(note_sequence: NoteSequence, num_midi_pitches: int = constants.NUM_P
     Args:
         note_sequence (NoteSequence): The input NoteSequence proto.
         num_midi_pitches (int, optional): The total number of MIDI pitches to consider. Defaults to 88 (piano range).
+        context (AttributesContext, optional): A context holding the data of note_sequence shared among attributes. If
+            None, a new one is built.
 
     Returns:
         (float): The contour of the NoteSequence.
     """
     if not note_sequence.notes:
         return 0.0
-    pitch_list = utilities.get_pitch_list(note_sequence)
-    metric = np.sum(np.abs(np.diff(pitch_list))) / num_midi_pitches
+    pitch_list = (context or common.AttributesContext(note_sequence)).pitches
+    pitch_intervals = np.diff(pitch_list)
+    # Take the absolute value in place, so that the intervals are the only temporary array
+    metric = np.abs(pitch_intervals, out=pitch_intervals).sum() / num_midi_pitches
     return metric
 
 
-def ratio_unique_notes(note_sequence: NoteSequence, num_midi_pitches: int = constants.NUM_PIANO_MIDI_PITCHES) -> float:
+def ratio_unique_notes(note_sequence: NoteSequence, num_midi_pitches: int = constants.NUM_PIANO_MIDI_PITCHES,
+                       context: common.AttributesContext = None) -> float:
     """ Compute the ratio of unique notes in a given NoteSequence proto.
 
     The ratio of unique notes is defined with respect to the total number of MIDI pitches considered and the length of
@@ -57,17 +64,21 @@ def ratio_unique_notes(note_sequence: NoteSequence, num_midi_pitches: int = cons
     Args:
         note_sequence (NoteSequence): The input NoteSequence proto.
         num_midi_pitches (int, optional): The total number of MIDI pitches to consider. Defaults to 88 (piano range).
+        context (AttributesContext, optional): A context holding the data of note_sequence shared among attributes. If
+            None, a new one is built.
 
     Returns:
         (float): The ratio of unique notes in the NoteSequence.
     """
     unique_notes = utilities.get_unique_notes(note_sequence)
-    normalization_factor = common.get_attribute_normalization_factor(note_sequence) * num_midi_pitches
+    context = context or common.AttributesContext(note_sequence)
+    normalization_factor = context.normalization_factor * num_midi_pitches
     return len(unique_notes) / normalization_factor
 
 
 def ratio_unique_ngrams(note_sequence: NoteSequence, n: int = 2,
-                        num_midi_pitches: int = constants.NUM_PIANO_MIDI_PITCHES) -> float:
+                        num_midi_pitches: int = constants.NUM_PIANO_MIDI_PITCHES,
+                        context: common.AttributesContext = None) -> float:
     """ Compute the ratio of unique n-grams in a given NoteSequence.
 
     The ratio of unique n-grams is defined with respect to the length of the sequence.
@@ -77,12 +88,13 @@ def ratio_unique_ngrams(note_sequence: NoteSequence, n: int = 2,
         n (int, optional): The size of n-grams to consider. Defaults to 2.
         num_midi_pitches (int, optional): The total number of MIDI pitches to consider.
             Defaults to 88 (piano range).
+        context (AttributesContext, optional): A context holding the data of note_sequence shared among attributes. If
+            None, a new one is built.
 
     Returns:
         (float): The ratio of unique n-grams in the NoteSequence.
     """
     note_sequence_ngrams = processors.extractor.extract_ngrams_from_note_sequence(note_sequence, n)
     unique_ngrams = utilities.get_unique_note_sequences(note_sequence_ngrams)
-    normalization_factor = common.get_attribute_normalization_factor(note_sequence)
-    max_number_unique_ngrams = perm(num_midi_pitches, n)
+    normalization_factor = (context or common.AttributesContext(note_sequence)).normalization_factor
     return len(unique_ngrams) / normalization_factor
@@ -1,11 +1,25 @@
 """ This module contains functions to compute attributes regarding the rhythmic of a NoteSequence proto. """
+import functools
+import itertools
+import operator
+from typing import List
+
 import numpy as np
 
+from . import common
 from .. import constants, utilities
 from ...protobuf import NoteSequence
 
+# Metrical hierarchy of the 16 steps of a bar used by the Toussaint metric. The weights are small, so they are stored
+# as bytes and only widened when summed.
+_TOUSSAINT_HIERARCHY = np.array([5, 1, 2, 1, 3, 1, 2, 1, 4, 1, 2, 1, 3, 1, 2, 1], dtype=np.uint8)
+# Distinct weights of the hierarchy in descending order with their number of occurrences in a bar (5, 4, 3, 2, 1 occur
+# 1, 1, 2, 4, 8 times). They are derived from the hierarchy, so they stay consistent if it changes.
+_TOUSSAINT_WEIGHTS, _TOUSSAINT_WEIGHT_COUNTS = np.flip(np.unique(_TOUSSAINT_HIERARCHY, return_counts=True), axis=1)
+
 
-def toussaint(note_sequence: NoteSequence, bars: int = None, binary: bool = True) -> float:
+def toussaint(note_sequence: NoteSequence, bars: int = None, binary: bool = True,
+              context: common.AttributesContext = None) -> float:
     """ Compute Toussaint metric for a quantized NoteSequence proto.
 
     Toussaint metric measures the degree of syncopation in rhythm patterns.
@@ -16,12 +30,15 @@ def toussaint(note_sequence: NoteSequence, bars: int = None, binary: bool = True
             If None, it's calculated from the note sequence.
         binary (bool, optional): If True, treat all note onsets equally (binary).
             If False, consider note velocities in the calculation. Defaults to True.
+        context (AttributesContext, optional): A context holding the data of note_sequence shared among attributes. If
+            None, a new one is built.
 
     Returns:
         (float): The Toussaint metric value.
 
     Raises:
         QuantizationStatusError: If note_sequence is not quantized relative to tempo.
+        ValueError: If note_sequence has more onsets than the steps of the given bars.
     """
     utilities.assert_is_relative_quantized_sequence(note_sequence)
 
@@ -31,22 +48,140 @@ def toussaint(note_sequence: NoteSequence, bars: int = None, binary: bool = True
     if bars is None:
         bars = utilities.bars_in_quantized_sequence(note_sequence)
 
-    hierarchy = np.array([5, 1, 2, 1, 3, 1, 2, 1, 4, 1, 2, 1, 3, 1, 2, 1]).repeat(bars)
-    max_sum = np.cumsum(np.sort(hierarchy)[::-1])
+    # The notes are read once for both the onsets count and the metricity
+    context = context or common.AttributesContext(note_sequence)
+    velocities = None if binary else context.velocities
+    return toussaint_from_arrays(context.start_steps, bars, velocities=velocities, n_onsets=context.onsets_count)
+
+
+def toussaint_from_arrays(start_steps: np.ndarray, bars: int, velocities: np.ndarray = None,
+                          n_onsets: int = None) -> float:
+    """ Compute Toussaint metric from the arrays of the notes of a quantized NoteSequence proto.
+
+    The computation only involves numpy operations on the given arrays, so the notes can be read from the protos
+    separately (e.g. in other processes) and the metric computed concurrently (e.g. in a thread pool).
+
+    Args:
+        start_steps (np.ndarray): The quantized start steps of the notes, in sequence order.
+        bars (int): The number of bars to consider.
+        velocities (np.ndarray, optional): The velocities of the notes, in the same order as start_steps. If None, all
+            note onsets are treated equally (binary). Otherwise, the velocities are considered in the calculation.
+            Defaults to None.
+        n_onsets (int, optional): The number of distinct note onsets. If None, it's the number of distinct start steps.
+            Defaults to None.
 
-    n_pulses = len(hierarchy)
-    n_onsets = utilities.count_onsets(note_sequence)
+    Returns:
+        (float): The Toussaint metric value.
 
-    velocity = np.zeros(n_pulses)
-    for note in note_sequence.notes:
-        velocity[note.quantized_start_step] = 1. if binary else note.velocity / constants.MAX_MIDI_VELOCITY
+    Raises:
+        ValueError: If there are more onsets than the steps of the given bars.
+    """
+    if not len(start_steps):
+        return 0.0
 
-    metricity = np.sum(hierarchy * velocity)
-    metric = max_sum[n_onsets-1] - metricity
+    # The metricity is the sum of the hierarchy weights of the onset steps (scaled by the onset velocity if not
+    # binary). The hierarchy is repeated element-wise for each bar, so the weight of step i is the base weight of
+    # step i // bars.
+    start_steps = np.asarray(start_steps)
+    if velocities is None:
+        # The weights are integers, so summing only the onset steps gives the exact metricity
+        onset_steps = np.unique(start_steps)
+        metricity = _TOUSSAINT_HIERARCHY[onset_steps // bars].sum(dtype=np.float64)
+    else:
+        # When several notes start on the same step the velocity of the last one is kept. The weighted velocities are
+        # summed over all the pulses, so that the floating point sum is the same as in the dense formulation.
+        onset_steps, last_note_indexes = np.unique(start_steps[::-1], return_index=True)
+        pulses_velocities = np.zeros(_TOUSSAINT_HIERARCHY.size * bars)
+        pulses_velocities[onset_steps] = np.asarray(velocities)[::-1][last_note_indexes] / constants.MAX_MIDI_VELOCITY
+        metricity = np.sum(np.repeat(_TOUSSAINT_HIERARCHY, bars) * pulses_velocities)
+    if n_onsets is None:
+        n_onsets = onset_steps.size
+    metric = _toussaint_max_sum(n_onsets, bars) - metricity
 
     return metric
 
 
+def toussaint_batch(note_sequences: List[NoteSequence], bars: int = None, binary: bool = True) -> np.ndarray:
+    """ Compute Toussaint metric for a batch of quantized NoteSequence protos.
+
+    The notes of all the sequences are read into flat arrays, together with the index of the sequence each note belongs
+    to, so that the metric of the whole batch is computed with a few numpy passes instead of one toussaint call per
+    sequence.
+
+    Args:
+        note_sequences (List[NoteSequence]): The input quantized NoteSequence protos.
+        bars (int, optional): The number of bars to consider for every sequence. Defaults to None.
+            If None, it's calculated from each note sequence.
+        binary (bool, optional): If True, treat all note onsets equally (binary).
+            If False, consider note velocities in the calculation. Defaults to True.
+
+    Returns:
+        (np.ndarray): The Toussaint metric value of each sequence.
+
+    Raises:
+        QuantizationStatusError: If any of note_sequences is not quantized relative to tempo.
+        ValueError: If any of note_sequences has more onsets than the steps of the given bars.
+    """
+    for note_sequence in note_sequences:
+        utilities.assert_is_relative_quantized_sequence(note_sequence)
+
+    # The repeated notes fields are looked up once and reused
+    sequences_notes = [note_sequence.notes for note_sequence in note_sequences]
+    n_sequences = len(note_sequences)
+    notes_per_sequence = np.fromiter(map(len, sequences_notes), dtype=np.int64, count=n_sequences)
+    metrics = np.zeros(n_sequences, dtype=np.float64)
+    non_empty = np.flatnonzero(notes_per_sequence)
+    if not non_empty.size:
+        return metrics
+
+    # Empty sequences are skipped by toussaint before computing their bars
+    sequences_bars = np.fromiter((bars if bars is not None else utilities.bars_in_quantized_sequence(ns) if n_notes
+                                  else 0 for ns, n_notes in zip(note_sequences, notes_per_sequence)),
+                                 dtype=np.int64, count=n_sequences)
+    notes = list(itertools.chain.from_iterable(sequences_notes))
+    sequence_indexes = np.repeat(np.arange(n_sequences), notes_per_sequence)
+    start_steps = _notes_field_array(notes, 'quantized_start_step', np.int64)
+
+    # Count the distinct start times of each sequence, with the same tolerance of utilities.float_equal
+    start_times = _notes_field_array(notes, 'start_time', np.float64)
+    order = np.lexsort((start_times, sequence_indexes))
+    sorted_times, sorted_indexes = start_times[order], sequence_indexes[order]
+    previous_times, next_times = sorted_times[:-1], sorted_times[1:]
+    tolerance = np.maximum(constants.FLOAT_RELATIVE_TOLERANCE * np.maximum(np.abs(previous_times), np.abs(next_times)),
+                           constants.FLOAT_ABSOLUTE_TOLERANCE)
+    is_new_onset = np.empty(len(notes), dtype=bool)
+    is_new_onset[0] = True
+    is_new_onset[1:] = (sorted_indexes[1:] != sorted_indexes[:-1]) | (next_times - previous_times > tolerance)
+    n_onsets = np.bincount(sorted_indexes[is_new_onset], minlength=n_sequences)
+
+    if not binary:
+        # The weighted velocities are summed per sequence by toussaint_from_arrays, since accumulating them across the
+        # batch would change the floating point sum of each sequence
+        velocities = _notes_field_array(notes, 'velocity', np.int32)
+        sequences_bounds = np.cumsum(notes_per_sequence)[:-1]
+        sequences_steps = np.split(start_steps, sequences_bounds)
+        sequences_velocities = np.split(velocities, sequences_bounds)
+        for i in non_empty:
+            metrics[i] = toussaint_from_arrays(sequences_steps[i], int(sequences_bars[i]),
+                                               velocities=sequences_velocities[i], n_onsets=int(n_onsets[i]))
+        return metrics
+
+    # Group the notes by sequence and start step and sum the integer weights of the first note of each group
+    order = np.lexsort((start_steps, sequence_indexes))
+    sorted_steps, sorted_indexes = start_steps[order], sequence_indexes[order]
+    onsets = np.empty(len(notes), dtype=bool)
+    onsets[0] = True
+    onsets[1:] = (sorted_indexes[1:] != sorted_indexes[:-1]) | (sorted_steps[1:] != sorted_steps[:-1])
+    onset_indexes = sorted_indexes[onsets]
+    weights = _TOUSSAINT_HIERARCHY[sorted_steps[onsets] // sequences_bars[onset_indexes]].astype(np.float64)
+    metricity = np.bincount(onset_indexes, weights=weights, minlength=n_sequences)
+
+    max_sums = np.fromiter((_toussaint_max_sum(int(n_onsets[i]), int(sequences_bars[i])) for i in non_empty),
+                           dtype=np.float64, count=non_empty.size)
+    metrics[non_empty] = max_sums - metricity[non_empty]
+    return metrics
+
+
 def note_density(note_sequence: NoteSequence, bars: int = None, binary: bool = True) -> float:
     """ Compute the note density metric for the given NoteSequence.
 
@@ -68,8 +203,31 @@ def note_density(note_sequence: NoteSequence, bars: int = None, binary: bool = T
     utilities.assert_is_relative_quantized_sequence(note_sequence)
     if not note_sequence.notes:
         return 0.0
+    steps_per_bar, sequence_bars, _, _ = utilities.quantization_geometry(note_sequence)
     if bars is None:
-        bars = utilities.bars_in_quantized_sequence(note_sequence)
+        bars = sequence_bars
     count = utilities.count_onsets(note_sequence) if binary else np.sum(utilities.get_velocity_list(note_sequence))
-    total_steps = utilities.steps_per_bar_in_quantized_sequence(note_sequence) * bars
+    total_steps = steps_per_bar * bars
     return count / total_steps
+
+
+@functools.lru_cache(maxsize=1024)
+def _toussaint_max_sum(n_onsets: int, bars: int) -> int:
+    # Maximum metricity of n_onsets onsets, i.e. the sum of the n_onsets greatest weights of the hierarchy repeated for
+    # each bar. Sorted in descending order, the repeated hierarchy is made of each distinct weight repeated by its count
+    # per bar times the number of bars, so the greatest weights are taken bucket by bucket.
+    if n_onsets > _TOUSSAINT_HIERARCHY.size * bars:
+        raise ValueError('Cannot compute the Toussaint metric of %d onsets in %d bars of %d steps.'
+                         % (n_onsets, bars, _TOUSSAINT_HIERARCHY.size))
+    max_sum = 0
+    for weight, count in zip(_TOUSSAINT_WEIGHTS.tolist(), _TOUSSAINT_WEIGHT_COUNTS.tolist()):
+        taken = min(n_onsets, count * bars)
+        max_sum += taken * weight
+        n_onsets -= taken
+        if not n_onsets:
+            break
+    return max_sum
+
+
+def _notes_field_array(notes: List[NoteSequence.Note], field_name: str, dtype: np.dtype) -> np.ndarray:
+    return np.fromiter(map(operator.attrgetter(field_name), notes), dtype=dtype, count=len(notes))
@@ -1,3 +1,5 @@
+import re
+
 from .exceptions import ChordSymbolError
 
 
@@ -27,4 +29,46 @@ def alter_scale_degree(degrees, degree, alter):
 
 def pitch_class_to_string(step, alter):
     """Convert a pitch class scale step and alteration to string."""
+    try:
+        return _PITCH_CLASS_STRINGS[(step, alter)]
+    except KeyError:
+        # Alteration outside the precomputed range.
+        return _pitch_class_to_string(step, alter)
+
+
+def _pitch_class_to_string(step, alter):
     return step + abs(alter) * ('#' if alter >= 0 else 'b')
+
+
+# Strings for all the pitch classes with alterations up to 7 sharps or flats.
+_PITCH_CLASS_STRINGS = dict(((step, alter), _pitch_class_to_string(step, alter))
+                            for step in 'ABCDEFG' for alter in range(-7, 8))
+
+
+def trie_pattern(strings):
+    """Build a regular expression matching any of the given strings.
+
+    The strings are arranged in a prefix trie and the pattern mirrors its structure,
+    e.g. ['m', 'm7', 'maj7'] becomes 'm(?:7|aj7)?'. Compared to a flat alternation,
+    the regex engine branches on the next character instead of trying every
+    alternative in turn, and longer strings are always tried before their prefixes.
+    """
+    trie = {}
+    for string in strings:
+        node = trie
+        for char in string:
+            node = node.setdefault(char, {})
+        node[None] = None
+
+    def _node_pattern(node):
+        alternatives = [re.escape(char) + _node_pattern(node[char])
+                        for char in sorted(char for char in node if char is not None)]
+        if not alternatives:
+            return ''
+        if None in node:
+            return '(?:%s)?' % '|'.join(alternatives)
+        if len(alternatives) == 1:
+            return alternatives[0]
+        return '(?:%s)' % '|'.join(alternatives)
+
+    return _node_pattern(trie)
@@ -5,6 +5,9 @@ from . import common
 # Intervals between scale steps.
 STEPS_ABOVE = {'A': 2, 'B': 1, 'C': 2, 'D': 2, 'E': 1, 'F': 2, 'G': 2}
 
+# Next scale step, wrapping around from G to A.
+NEXT_STEP = {'A': 'B', 'B': 'C', 'C': 'D', 'D': 'E', 'E': 'F', 'F': 'G', 'G': 'A'}
+
 # List of chord kinds with abbreviations and scale degrees. Scale degrees are
 # represented as strings here a) for human readability, and b) because the
 # number of semitones is insufficient when the chords have scale degree
@@ -152,15 +155,19 @@ DEGREE_MODIFICATIONS = {
 # Examples: 'C', 'G#', 'Ab', 'D######'
 ROOT_PATTERN = r'[A-G](?:#*|b*)(?![#b])'
 
-# Regular expression for chord kind (abbreviated).
+# Regular expression for chord kind (abbreviated). The abbreviations are factored
+# by common prefix, so that the longest matching chord kind is tried first and
+# matching does not need to backtrack through every abbreviation.
 # Examples: '', 'm7b5', 'min', '-13', '+', 'm(M7)', 'dim', '/o7', 'sus2'
-CHORD_KIND_PATTERN = '|'.join(re.escape(abbrev) for abbrev in CHORD_KINDS_BY_ABBREV)
+CHORD_KIND_PATTERN = common.trie_pattern(CHORD_KINDS_BY_ABBREV)
 
 # Regular expression for scale degree modifications. (To keep the regex simpler,
 # parentheses are not required to match here, e.g. '(#9', 'add2)', '(b5(#9)',
 # and 'no5)(b9' will all match.)
+# Modification types are factored by common prefix like the chord kinds, so
+# e.g. 'add#' is tried before 'add'.
 # Examples: '#9', 'add6add9', 'no5(b9)', '(add2b5no3)', '(no5)(b9)'
-MODIFICATIONS_PATTERN = r'(?:\(?(?:%s)[0-9]+\)?)*' % '|'.join(re.escape(mod) for mod in DEGREE_MODIFICATIONS)
+MODIFICATIONS_PATTERN = r'(?:\(?(?:%s)[0-9]+\)?)*' % common.trie_pattern(DEGREE_MODIFICATIONS)
 
 # Regular expression for chord bass.
 # Examples: '', '/C', '/Bb', '/F##', '/Dbbbb'
@@ -172,21 +179,21 @@ CHORD_SYMBOL_PATTERN = ''.join('(%s)' % pattern for pattern in [
     CHORD_KIND_PATTERN,  # chord kind
     MODIFICATIONS_PATTERN,  # scale degree modifications
     BASS_PATTERN]) + '$'  # bass pitch class
-CHORD_SYMBOL_REGEX = re.compile(CHORD_SYMBOL_PATTERN)
+CHORD_SYMBOL_REGEX = re.compile(CHORD_SYMBOL_PATTERN, re.ASCII)
 
 # Regular expression for a single pitch class.
 # Examples: 'C', 'G#', 'Ab', 'D######'
 PITCH_CLASS_PATTERN = r'([A-G])(#*|b*)$'
-PITCH_CLASS_REGEX = re.compile(PITCH_CLASS_PATTERN)
+PITCH_CLASS_REGEX = re.compile(PITCH_CLASS_PATTERN, re.ASCII)
 
 # Regular expression for a single scale degree.
 # Examples: '1', '7', 'b3', '#5', 'bb7', '13'
 SCALE_DEGREE_PATTERN = r'(#*|b*)([0-9]+)$'
-SCALE_DEGREE_REGEX = re.compile(SCALE_DEGREE_PATTERN)
+SCALE_DEGREE_REGEX = re.compile(SCALE_DEGREE_PATTERN, re.ASCII)
 
 # Regular expression for a single scale degree modification. (To keep the regex
 # simpler, parentheses are not required to match here, so open or closing paren
 # could be missing, e.g. '(#9' and 'add2)' will both match.)
 # Examples: '#9', 'add6', 'no5', '(b5)', '(add9)'
-MODIFICATION_PATTERN = r'\(?(%s)([0-9]+)\)?' % '|'.join(re.escape(mod) for mod in DEGREE_MODIFICATIONS)
-MODIFICATION_REGEX = re.compile(MODIFICATION_PATTERN)
+MODIFICATION_PATTERN = r'\(?(%s)([0-9]+)\)?' % common.trie_pattern(DEGREE_MODIFICATIONS)
+MODIFICATION_REGEX = re.compile(MODIFICATION_PATTERN, re.ASCII)
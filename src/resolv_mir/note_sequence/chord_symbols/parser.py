@@ -1,34 +1,46 @@
-import re
+import functools
 
 from . import constants
 
+# Bound regex methods, resolved once instead of on every call.
+_PITCH_CLASS_MATCH = constants.PITCH_CLASS_REGEX.match
+_SCALE_DEGREE_MATCH = constants.SCALE_DEGREE_REGEX.match
+_MODIFICATION_FINDITER = constants.MODIFICATION_REGEX.finditer
 
+
+@functools.lru_cache(maxsize=1024)
 def parse_pitch_class(pitch_class_str):
     """Parse pitch class from string, returning scale step and alteration."""
-    match = re.match(constants.PITCH_CLASS_REGEX, pitch_class_str)
+    match = _PITCH_CLASS_MATCH(pitch_class_str)
     step, alter = match.groups()
-    return step, len(alter) * (1 if '#' in alter else -1)
+    return step, len(alter) * (1 if alter.startswith('#') else -1)
 
 
-def parse_root(root_str):
-    """Parse chord root from string."""
-    return parse_pitch_class(root_str)
+# Parse chord root from string.
+parse_root = parse_pitch_class
 
 
 def parse_degree(degree_str):
     """Parse scale degree from string (from internal kind representation)."""
-    match = constants.SCALE_DEGREE_REGEX.match(degree_str)
+    match = _SCALE_DEGREE_MATCH(degree_str)
     alter, degree = match.groups()
-    return int(degree), len(alter) * (1 if '#' in alter else -1)
+    return int(degree), len(alter) * (1 if alter.startswith('#') else -1)
+
+
+# Dictionary mapping chord kind abbreviations to their parsed scale degrees. The
+# chord kinds table is static, so the scale degree strings are parsed only once.
+# Here we make the assumption that each scale degree can be present in a chord
+# at most once. This is not generally true, as e.g. a chord could contain both
+# b9 and #9.
+_CHORD_KINDS_BY_ABBREV_PARSED = dict(
+    (abbrev, dict(parse_degree(degree_str) for degree_str in degrees))
+    for abbrev, degrees in constants.CHORD_KINDS_BY_ABBREV.items())
 
 
 def parse_kind(kind_str):
     """Parse chord kind from string, returning a scale degree dictionary."""
-    degrees = constants.CHORD_KINDS_BY_ABBREV[kind_str]
-    # Here we make the assumption that each scale degree can be present in a chord
-    # at most once. This is not generally true, as e.g. a chord could contain both
-    # b9 and #9.
-    return dict(parse_degree(degree_str) for degree_str in degrees)
+    # Return a copy since callers may apply scale degree modifications to it.
+    return _CHORD_KINDS_BY_ABBREV_PARSED[kind_str].copy()
 
 
 def parse_modifications(modifications_str):
@@ -49,13 +61,10 @@ def parse_modifications(modifications_str):
       modification.
     """
     modifications = []
-    while modifications_str:
-        match = constants.MODIFICATION_REGEX.match(modifications_str)
+    for match in _MODIFICATION_FINDITER(modifications_str):
         type_str, degree_str = match.groups()
         mod_fn, alter = constants.DEGREE_MODIFICATIONS[type_str]
         modifications.append((mod_fn, int(degree_str), alter))
-        modifications_str = modifications_str[match.end():]
-        assert match.end() > 0
     return modifications
 
 
@@ -1,10 +1,16 @@
+import functools
+
 from . import constants
 from .exceptions import ChordSymbolError
 
+# Bound regex method, resolved once instead of on every call.
+_CHORD_SYMBOL_MATCH = constants.CHORD_SYMBOL_REGEX.match
+
 
+@functools.lru_cache(maxsize=1024)
 def split_chord_symbol(figure):
     """Split a chord symbol into root, kind, degree modifications, and bass."""
-    match = constants.CHORD_SYMBOL_REGEX.match(figure)
+    match = _CHORD_SYMBOL_MATCH(figure)
     if not match:
         raise ChordSymbolError('Unable to parse chord symbol: %s' % figure)
     root_str, kind_str, modifications_str, bass_str = match.groups()
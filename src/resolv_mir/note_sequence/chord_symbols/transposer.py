@@ -1,9 +1,19 @@
+import functools
+import sys
+from typing import List
+
+import numpy as np
+
 from . import common, parser, splitter, constants
 
 
+@functools.lru_cache(maxsize=4096)
 def transpose_chord_symbol(figure, transpose_amount):
     """Transposes a chord symbol figure string by the given amount.
 
+    Results are memoized, since the same few chord symbols are usually transposed
+    many times over a corpus.
+
     Args:
       figure: The chord symbol figure string to transpose.
       transpose_amount: The integer number of half steps to transpose.
@@ -34,25 +44,122 @@ def transpose_chord_symbol(figure, transpose_amount):
         # No bass.
         transposed_bass_str = bass_str
 
-    return '%s%s%s%s' % (transposed_root_str, kind_str, modifications_str, transposed_bass_str)
+    # Intern the result, since the same few transposed figures are produced over and over.
+    return sys.intern('%s%s%s%s' % (transposed_root_str, kind_str, modifications_str, transposed_bass_str))
+
+
+def transpose_chord_symbols_batch(figures: List[str], transpose_amount: int) -> List[str]:
+    """Transposes a list of chord symbol figure strings by the given amount.
+
+    Each distinct figure is split and parsed only once, then all roots and basses are
+    transposed together with transpose_pitch_class_batch.
+
+    Args:
+      figures: The chord symbol figure strings to transpose.
+      transpose_amount: The integer number of half steps to transpose.
+
+    Returns:
+      The list of transposed chord symbol figure strings, in the same order as figures.
+
+    Raises:
+      ChordSymbolError: If any of the given chord symbols cannot be interpreted.
+    """
+    unique_figures = list(dict.fromkeys(figures))
+    split_figures = [splitter.split_chord_symbol(figure) for figure in unique_figures]
+    bass_strs = [bass_str for _, _, _, bass_str in split_figures if bass_str]
+
+    # Transpose roots and basses at once.
+    pitch_classes = ([parser.parse_root(root_str) for root_str, _, _, _ in split_figures] +
+                     [parser.parse_bass(bass_str) for bass_str in bass_strs])
+    steps = np.array([_STEP_INDEX[step] for step, _ in pitch_classes], dtype=int)
+    alters = np.array([alter for _, alter in pitch_classes], dtype=int)
+    transposed_steps, transposed_alters = transpose_pitch_class_batch(steps, alters, transpose_amount)
+    transposed_pitch_class_strs = [
+        common.pitch_class_to_string(_STEPS[step], alter)
+        for step, alter in zip(transposed_steps.tolist(), transposed_alters.tolist())
+    ]
+    transposed_root_strs = transposed_pitch_class_strs[:len(split_figures)]
+    transposed_bass_strs = iter(transposed_pitch_class_strs[len(split_figures):])
+
+    transposed_figures = {}
+    for figure, transposed_root_str, (_, kind_str, modifications_str, bass_str) in zip(
+            unique_figures, transposed_root_strs, split_figures):
+        transposed_bass_str = '/' + next(transposed_bass_strs) if bass_str else bass_str
+        transposed_figures[figure] = sys.intern('%s%s%s%s' % (transposed_root_str, kind_str, modifications_str,
+                                                              transposed_bass_str))
+    return [transposed_figures[figure] for figure in figures]
+
+
+def transpose_pitch_class_batch(steps: np.ndarray, alters: np.ndarray, transpose_amount: int):
+    """Transposes arrays of pitch classes by the given amount.
+
+    This is the vectorized equivalent of transpose_pitch_class.
+
+    Args:
+      steps: Integer array of scale steps, as indices from 0 (A) to 6 (G).
+      alters: Integer array of alterations, with the same shape as steps.
+      transpose_amount: The integer number of half steps to transpose.
+
+    Returns:
+      A tuple with the arrays of transposed scale step indices and alterations.
+    """
+    transpose_amount %= 12
+    steps = np.asarray(steps)
+    alters = np.asarray(alters)
+    # Transpose up as many steps as we can.
+    whole_steps = np.count_nonzero(_HALF_STEPS_ABOVE[steps] <= transpose_amount, axis=-1) - 1
+    transpose_amount = transpose_amount - _HALF_STEPS_ABOVE[steps, whole_steps]
+    steps = (steps + whole_steps) % 7
+    # Transpose up one more step and remove sharps (or add flats), or remove flats.
+    step_up = (transpose_amount > 0) & (alters >= 0)
+    alters = np.where(step_up, alters - (_STEPS_ABOVE[steps] - transpose_amount), alters + transpose_amount)
+    steps = np.where(step_up, (steps + 1) % 7, steps)
+    return steps, alters
 
 
 def transpose_pitch_class(step, alter, transpose_amount):
-    """Transposes a chord symbol figure string by the given amount."""
+    """Transposes a pitch class scale step and alteration by the given amount."""
     transpose_amount %= 12
+    try:
+        return _TRANSPOSE_PITCH_CLASS_TABLE[(step, alter, transpose_amount)]
+    except KeyError:
+        # Alteration outside the precomputed range.
+        return _transpose_pitch_class(step, alter, transpose_amount)
+
 
+def _transpose_pitch_class(step, alter, transpose_amount):
+    """Transposes a pitch class by an amount of half steps in [0, 12)."""
     # Transpose up as many steps as we can.
     while transpose_amount >= constants.STEPS_ABOVE[step]:
         transpose_amount -= constants.STEPS_ABOVE[step]
-        step = chr(ord('A') + (ord(step) - ord('A') + 1) % 7)
+        step = constants.NEXT_STEP[step]
 
     if transpose_amount > 0:
         if alter >= 0:
             # Transpose up one more step and remove sharps (or add flats).
             alter -= constants.STEPS_ABOVE[step] - transpose_amount
-            step = chr(ord('A') + (ord(step) - ord('A') + 1) % 7)
+            step = constants.NEXT_STEP[step]
         else:
             # Remove flats.
             alter += transpose_amount
 
     return step, alter
+
+
+# Lookup table mapping (step, alter, transpose_amount) to the transposed pitch class,
+# for every scale step, alterations up to 7 sharps or flats and every transpose
+# amount in [0, 12).
+_TRANSPOSE_PITCH_CLASS_TABLE = dict(
+    ((step, alter, transpose_amount), _transpose_pitch_class(step, alter, transpose_amount))
+    for step in constants.STEPS_ABOVE for alter in range(-7, 8) for transpose_amount in range(12))
+
+
+# Scale steps by index and their intervals, used by the batch transposition functions.
+_STEPS = sorted(constants.STEPS_ABOVE)
+_STEP_INDEX = dict((step, idx) for idx, step in enumerate(_STEPS))
+_STEPS_ABOVE = np.array([constants.STEPS_ABOVE[step] for step in _STEPS])
+# _HALF_STEPS_ABOVE[step, n]: number of half steps between a scale step and the n-th scale step above it.
+_HALF_STEPS_ABOVE = np.array([
+    np.concatenate(([0], np.cumsum(np.roll(_STEPS_ABOVE, -step_idx))))
+    for step_idx in range(len(_STEPS))
+])
@@ -18,7 +18,8 @@ SYNTH_EFFECTS_PROGRAMS = range(96, 104)
 ETHNIC_PROGRAMS = range(104, 112)
 PERCUSSIVE_PROGRAMS = range(112, 119)
 SOUND_EFFECTS_PROGRAMS = range(119, 128)
-UN_PITCHED_PROGRAMS = list(SYNTH_EFFECTS_PROGRAMS) + list(PERCUSSIVE_PROGRAMS) + list(SOUND_EFFECTS_PROGRAMS)
+UN_PITCHED_PROGRAMS = frozenset(list(SYNTH_EFFECTS_PROGRAMS) + list(PERCUSSIVE_PROGRAMS) +
+                                list(SOUND_EFFECTS_PROGRAMS))
 
 # Meter-related constants.
 DEFAULT_QUARTERS_PER_MINUTE = 120
@@ -46,9 +47,9 @@ PIANO_MAX_MIDI_PITCH = 108
 NUM_MIDI_PITCHES = MAX_MIDI_PITCH - MIN_MIDI_PITCH + 1
 NUM_PIANO_MIDI_PITCHES = PIANO_MAX_MIDI_PITCH - PIANO_MIN_MIDI_PITCH + 1
 NOTES_PER_OCTAVE = 12
-MEL_PROGRAMS = (list(PIANO_PROGRAMS) + list(CHROMATIC_PERCUSSION_PROGRAMS) + list(ORGAN_PROGRAMS) +
-                list(GUITAR_PROGRAMS) + list(STRING_PROGRAMS) + list(REED_PROGRAMS) + list(PIPE_PROGRAMS)
-                + list(SYNTH_LEAD_PROGRAMS) + list(ETHNIC_PROGRAMS))
+MEL_PROGRAMS = frozenset(list(PIANO_PROGRAMS) + list(CHROMATIC_PERCUSSION_PROGRAMS) + list(ORGAN_PROGRAMS) +
+                         list(GUITAR_PROGRAMS) + list(STRING_PROGRAMS) + list(REED_PROGRAMS) + list(PIPE_PROGRAMS)
+                         + list(SYNTH_LEAD_PROGRAMS) + list(ETHNIC_PROGRAMS))
 
 # Velocity-related constants.
 DEFAULT_MIDI_VELOCITY = 64
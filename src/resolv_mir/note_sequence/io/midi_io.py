@@ -1,12 +1,18 @@
 """Input and output wrappers for converting between MIDI and other formats."""
-import collections
+import concurrent.futures
+import functools
 import io
 import sys
 from pathlib import Path
-from typing import Dict, Union, Any
+from typing import Dict, Union, Any, BinaryIO, Iterable, Iterator
 
 import pretty_midi
 
+try:
+    import symusic
+except ImportError:
+    symusic = None
+
 from .utilities import populate_sequence_metadata
 from .. import constants
 from ..exceptions import MIDIConversionError
@@ -21,25 +27,43 @@ from resolv_mir.protobuf import NoteSequence
 # generating a PrettyMIDI KeySignature.
 _PRETTY_MIDI_MAJOR_TO_MINOR_OFFSET = 12
 
+# Backends available to decode raw MIDI data. symusic is an optional dependency with a C++ parser that is much faster
+# than pretty_midi on large files.
+MIDI_BACKENDS = ('pretty_midi', 'symusic')
 
-def midi_to_note_sequence(midi_data: Union[pretty_midi.PrettyMIDI, bytes], metadata: Dict[str, Any] = None) \
-        -> NoteSequence:
+# The General MIDI instrument names are static, cache the lookups used when writing instruments.
+_program_to_instrument_name = functools.lru_cache(maxsize=128)(pretty_midi.program_to_instrument_name)
+
+
+def midi_to_note_sequence(midi_data: Union[pretty_midi.PrettyMIDI, 'symusic.Score', bytes, BinaryIO],
+                          metadata: Dict[str, Any] = None, backend: str = 'pretty_midi') -> NoteSequence:
     """ Convert MIDI file content to a NoteSequence proto.
 
     Converts a MIDI file encoded as a string into a NoteSequence. Decoding errors are very common when working with
     large sets of MIDI files, so be sure to handle MIDIConversionError exceptions.
 
     Args:
-        midi_data (Union[pretty_midi.PrettyMIDI, bytes]): A string containing the contents of a MIDI file or a
-            populated pretty_midi.PrettyMIDI object.
+        midi_data (Union[pretty_midi.PrettyMIDI, symusic.Score, bytes, BinaryIO]): A string containing the contents
+            of a MIDI file, a binary file object opened on a MIDI file, a populated pretty_midi.PrettyMIDI object or a
+            symusic.Score object.
         metadata (Dict[str, Any]): A dictionary containing metadata relative to the MIDI file (title, release, ecc...).
+        backend (str): The backend used to decode raw MIDI data, one of MIDI_BACKENDS. Ignored if midi_data is
+            already a decoded object.
 
     Returns:
         (NoteSequence) A NoteSequence proto.
 
     Raises:
         MIDIConversionError: If improper MIDI data were supplied.
+        ValueError: If backend is not a supported MIDI backend.
+        ImportError: If the symusic backend is requested but symusic is not installed.
     """
+    if backend not in MIDI_BACKENDS:
+        raise ValueError('Unsupported MIDI backend %s. Supported backends are %s.' % (backend, MIDI_BACKENDS))
+    if (symusic is not None and isinstance(midi_data, symusic.Score)) or \
+            (backend == 'symusic' and not isinstance(midi_data, pretty_midi.PrettyMIDI)):
+        return _symusic_to_note_sequence(midi_data, metadata)
+
     # In practice many MIDI files cannot be decoded with pretty_midi. Catch all
     # errors here and try to log a meaningful message. So many different
     # exceptions are raised in pretty_midi.PrettyMidi that it is cumbersome to
@@ -49,10 +73,10 @@ def midi_to_note_sequence(midi_data: Union[pretty_midi.PrettyMIDI, bytes], metad
         midi = midi_data
     else:
         try:
-            midi = pretty_midi.PrettyMIDI(io.BytesIO(midi_data))
+            midi = pretty_midi.PrettyMIDI(io.BytesIO(midi_data) if isinstance(midi_data, bytes) else midi_data)
         except:
-            raise MIDIConversionError('MIDI %s decoding error %s: %s' % (metadata['filepath'], sys.exc_info()[0],
-                                                                         sys.exc_info()[1]))
+            raise MIDIConversionError('MIDI %s decoding error %s: %s' % ((metadata or {}).get('filepath'),
+                                                                         sys.exc_info()[0], sys.exc_info()[1]))
     # pylint: enable=bare-except
 
     sequence = NoteSequence()
@@ -64,87 +88,57 @@ def midi_to_note_sequence(midi_data: Union[pretty_midi.PrettyMIDI, bytes], metad
 
     # Populate time signatures.
     for midi_time in midi.time_signature_changes:
-        time_signature = sequence.time_signatures.add()
-        time_signature.time = midi_time.time
-        time_signature.numerator = midi_time.numerator
         try:
             # Denominator can be too large for int32.
-            time_signature.denominator = midi_time.denominator
+            sequence.time_signatures.add(time=midi_time.time, numerator=midi_time.numerator,
+                                         denominator=midi_time.denominator)
         except ValueError:
             raise MIDIConversionError('Invalid time signature denominator %d' %
                                       midi_time.denominator)
 
     # Populate key signatures.
     for midi_key in midi.key_signature_changes:
-        key_signature = sequence.key_signatures.add()
-        key_signature.time = midi_key.time
-        key_signature.key = midi_key.key_number % 12
         midi_mode = midi_key.key_number // 12
         if midi_mode == 0:
-            key_signature.mode = key_signature.MAJOR
+            mode = NoteSequence.KeySignature.MAJOR
         elif midi_mode == 1:
-            key_signature.mode = key_signature.MINOR
+            mode = NoteSequence.KeySignature.MINOR
         else:
             raise MIDIConversionError('Invalid midi_mode %i' % midi_mode)
+        sequence.key_signatures.add(time=midi_key.time, key=midi_key.key_number % 12, mode=mode)
 
     # Populate tempo changes.
     tempo_times, tempo_qpms = midi.get_tempo_changes()
-    for time_in_seconds, tempo_in_qpm in zip(tempo_times, tempo_qpms):
-        tempo = sequence.tempos.add()
-        tempo.time = time_in_seconds
-        tempo.qpm = tempo_in_qpm
+    add_tempo = sequence.tempos.add
+    for time_in_seconds, tempo_in_qpm in zip(tempo_times.tolist(), tempo_qpms.tolist()):
+        add_tempo(time=time_in_seconds, qpm=tempo_in_qpm)
 
     # Populate notes by gathering them all from the midi's instruments.
     # Also set the sequence.total_time as the max end time in the notes.
-    midi_notes = []
-    midi_pitch_bends = []
-    midi_control_changes = []
+    # Events are built in place with the keyword form of add(), which avoids both setting each field through the
+    # repeated field element and copying messages constructed outside the sequence.
+    add_note = sequence.notes.add
+    add_pitch_bend = sequence.pitch_bends.add
+    add_control_change = sequence.control_changes.add
     for num_instrument, midi_instrument in enumerate(midi.instruments):
         # Populate instrument name from the midi's instruments
         if midi_instrument.name:
             instrument_info = sequence.instrument_infos.add()
             instrument_info.name = midi_instrument.name
             instrument_info.instrument = num_instrument
+        program, is_drum = midi_instrument.program, midi_instrument.is_drum
         for midi_note in midi_instrument.notes:
             if not sequence.total_time or midi_note.end > sequence.total_time:
                 sequence.total_time = midi_note.end
-            midi_notes.append((midi_instrument.program, num_instrument,
-                               midi_instrument.is_drum, midi_note))
+            add_note(instrument=num_instrument, program=program, start_time=midi_note.start, end_time=midi_note.end,
+                     pitch=midi_note.pitch, velocity=midi_note.velocity, is_drum=is_drum)
         for midi_pitch_bend in midi_instrument.pitch_bends:
-            midi_pitch_bends.append(
-                (midi_instrument.program, num_instrument,
-                 midi_instrument.is_drum, midi_pitch_bend))
+            add_pitch_bend(instrument=num_instrument, program=program, time=midi_pitch_bend.time,
+                           bend=midi_pitch_bend.pitch, is_drum=is_drum)
         for midi_control_change in midi_instrument.control_changes:
-            midi_control_changes.append(
-                (midi_instrument.program, num_instrument,
-                 midi_instrument.is_drum, midi_control_change))
-
-    for program, instrument, is_drum, midi_note in midi_notes:
-        note = sequence.notes.add()
-        note.instrument = instrument
-        note.program = program
-        note.start_time = midi_note.start
-        note.end_time = midi_note.end
-        note.pitch = midi_note.pitch
-        note.velocity = midi_note.velocity
-        note.is_drum = is_drum
-
-    for program, instrument, is_drum, midi_pitch_bend in midi_pitch_bends:
-        pitch_bend = sequence.pitch_bends.add()
-        pitch_bend.instrument = instrument
-        pitch_bend.program = program
-        pitch_bend.time = midi_pitch_bend.time
-        pitch_bend.bend = midi_pitch_bend.pitch
-        pitch_bend.is_drum = is_drum
-
-    for program, instrument, is_drum, midi_control_change in midi_control_changes:
-        control_change = sequence.control_changes.add()
-        control_change.instrument = instrument
-        control_change.program = program
-        control_change.time = midi_control_change.time
-        control_change.control_number = midi_control_change.number
-        control_change.control_value = midi_control_change.value
-        control_change.is_drum = is_drum
+            add_control_change(instrument=num_instrument, program=program, time=midi_control_change.time,
+                               control_number=midi_control_change.number,
+                               control_value=midi_control_change.value, is_drum=is_drum)
 
     # TODO - MIDI conversion: Estimate note type (e.g. quarter note) and populate note.numerator and note.denominator.
 
@@ -153,21 +147,154 @@ def midi_to_note_sequence(midi_data: Union[pretty_midi.PrettyMIDI, bytes], metad
     return sequence
 
 
-def midi_file_to_note_sequence(midi_file: Union[str, Path]) -> NoteSequence:
+def midi_file_to_note_sequence(midi_file: Union[str, Path], backend: str = 'pretty_midi') -> NoteSequence:
     """ Convert a MIDI file to a NoteSequence proto.
 
     Args:
         midi_file (Union[str, Path]): A Path object or string path to a MIDI file.
+        backend (str): The backend used to decode the MIDI file, one of MIDI_BACKENDS.
 
     Returns:
         (NoteSequence) A NoteSequence proto.
 
     Raises:
         MIDIConversionError: If improper MIDI data were supplied.
+        ValueError: If backend is not a supported MIDI backend.
+        ImportError: If the symusic backend is requested but symusic is not installed.
     """
+    # The file is decoded straight from the handle, without reading it in an intermediate bytes object first.
     with open(midi_file, 'rb') as f:
-        midi_as_string = f.read()
-        return midi_to_note_sequence(midi_as_string)
+        return midi_to_note_sequence(f, backend=backend)
+
+
+def midi_files_to_note_sequences(midi_files: Iterable[Union[str, Path]], n_workers: int = None, chunksize: int = 32,
+                                 backend: str = 'pretty_midi') -> Iterator[NoteSequence]:
+    """ Convert several MIDI files to NoteSequence protos in parallel.
+
+    The files are converted by a pool of worker processes. The protos are sent back to the main process serialized
+    and are yielded in the same order of midi_files.
+
+    Args:
+        midi_files (Iterable[Union[str, Path]]): The Path objects or string paths to the MIDI files.
+        n_workers (int): The number of worker processes. If None, the number of processors on the machine is used.
+        chunksize (int): The number of files sent to a worker process at a time.
+        backend (str): The backend used to decode the MIDI files, one of MIDI_BACKENDS.
+
+    Returns:
+        (Iterator[NoteSequence]) An iterator over the NoteSequence protos.
+
+    Raises:
+        MIDIConversionError: If improper MIDI data were supplied for one of the files. The conversion of the remaining
+            files is stopped.
+        ValueError: If backend is not a supported MIDI backend.
+        ImportError: If the symusic backend is requested but symusic is not installed.
+    """
+    with concurrent.futures.ProcessPoolExecutor(max_workers=n_workers) as executor:
+        convert_fn = functools.partial(_midi_file_to_serialized_note_sequence, backend=backend)
+        for serialized_sequence in executor.map(convert_fn, midi_files, chunksize=chunksize):
+            yield NoteSequence.FromString(serialized_sequence)
+
+
+def _midi_file_to_serialized_note_sequence(midi_file: Union[str, Path], backend: str) -> bytes:
+    return midi_file_to_note_sequence(midi_file, backend=backend).SerializeToString()
+
+
+def _symusic_to_note_sequence(midi_data: Union['symusic.Score', bytes, BinaryIO], metadata: Dict[str, Any] = None) \
+        -> NoteSequence:
+    """ Convert a symusic.Score (or raw MIDI data decoded with symusic) to a NoteSequence proto.
+
+    symusic stores the events of every track in columnar arrays, so the notes are read in bulk instead of going
+    through a Python object per note as done by pretty_midi. Note that symusic represents times in seconds as 32-bit
+    floats.
+
+    Args:
+        midi_data (Union[symusic.Score, bytes, BinaryIO]): A string containing the contents of a MIDI file, a binary
+            file object opened on a MIDI file or a symusic.Score object.
+        metadata (Dict[str, Any]): A dictionary containing metadata relative to the MIDI file (title, release, ecc...).
+
+    Returns:
+        (NoteSequence) A NoteSequence proto.
+
+    Raises:
+        MIDIConversionError: If improper MIDI data were supplied.
+        ImportError: If symusic is not installed.
+    """
+    if symusic is None:
+        raise ImportError('The symusic MIDI backend requires the symusic package to be installed.')
+    # pylint: disable=bare-except
+    if isinstance(midi_data, symusic.Score):
+        score = midi_data if midi_data.ttype == symusic.TimeUnit.second else midi_data.to(symusic.TimeUnit.second)
+    else:
+        try:
+            score = symusic.Score.from_midi(midi_data if isinstance(midi_data, bytes) else midi_data.read(),
+                                            ttype=symusic.TimeUnit.second)
+        except:
+            raise MIDIConversionError('MIDI %s decoding error %s: %s' % ((metadata or {}).get('filepath'),
+                                                                         sys.exc_info()[0], sys.exc_info()[1]))
+    # pylint: enable=bare-except
+
+    sequence = NoteSequence()
+
+    # Populate header.
+    sequence.ticks_per_quarter = score.ticks_per_quarter
+    sequence.source_info.parser = NoteSequence.SourceInfo.UNKNOWN_PARSER
+    sequence.source_info.encoding_type = NoteSequence.SourceInfo.MIDI
+
+    # Populate time signatures.
+    for midi_time in score.time_signatures:
+        sequence.time_signatures.add(time=midi_time.time, numerator=midi_time.numerator,
+                                     denominator=midi_time.denominator)
+
+    # Populate key signatures. symusic stores the number of sharps (negative for flats) and the tonality as in the
+    # MIDI meta message, convert them to the tonic pitch class.
+    for midi_key in score.key_signatures:
+        if midi_key.tonality == 0:
+            key, mode = (midi_key.key * 7) % 12, NoteSequence.KeySignature.MAJOR
+        elif midi_key.tonality == 1:
+            key, mode = (midi_key.key * 7 + 9) % 12, NoteSequence.KeySignature.MINOR
+        else:
+            raise MIDIConversionError('Invalid midi_mode %i' % midi_key.tonality)
+        sequence.key_signatures.add(time=midi_key.time, key=key, mode=mode)
+
+    # Populate tempo changes. As pretty_midi does, assume the default tempo until the first tempo change.
+    add_tempo = sequence.tempos.add
+    if not len(score.tempos) or score.tempos[0].time > 0:
+        add_tempo(time=0, qpm=constants.DEFAULT_QUARTERS_PER_MINUTE)
+    for midi_tempo in score.tempos:
+        add_tempo(time=midi_tempo.time, qpm=midi_tempo.qpm)
+
+    # Populate notes, pitch bends and control changes from the score's tracks.
+    # Also set the sequence.total_time as the max end time in the notes.
+    add_note = sequence.notes.add
+    add_pitch_bend = sequence.pitch_bends.add
+    add_control_change = sequence.control_changes.add
+    for num_instrument, track in enumerate(score.tracks):
+        # Populate instrument name from the score's tracks
+        if track.name:
+            instrument_info = sequence.instrument_infos.add()
+            instrument_info.name = track.name
+            instrument_info.instrument = num_instrument
+        program, is_drum = track.program, track.is_drum
+        track_notes = track.notes.numpy()
+        start_times = track_notes['time'].tolist()
+        end_times = (track_notes['time'] + track_notes['duration']).tolist()
+        if end_times:
+            sequence.total_time = max(sequence.total_time, max(end_times))
+        for start_time, end_time, pitch, velocity in zip(start_times, end_times, track_notes['pitch'].tolist(),
+                                                         track_notes['velocity'].tolist()):
+            add_note(instrument=num_instrument, program=program, start_time=start_time, end_time=end_time,
+                     pitch=pitch, velocity=velocity, is_drum=is_drum)
+        for midi_pitch_bend in track.pitch_bends:
+            add_pitch_bend(instrument=num_instrument, program=program, time=midi_pitch_bend.time,
+                           bend=midi_pitch_bend.value, is_drum=is_drum)
+        for midi_control_change in track.controls:
+            add_control_change(instrument=num_instrument, program=program, time=midi_control_change.time,
+                               control_number=midi_control_change.number,
+                               control_value=midi_control_change.value, is_drum=is_drum)
+
+    sequence = populate_sequence_metadata(sequence, 'midi', metadata)
+
+    return sequence
 
 
 def note_sequence_to_midi(note_sequence: NoteSequence, drop_events_n_seconds_after_last_note: float = None) \
@@ -189,7 +316,7 @@ def note_sequence_to_midi(note_sequence: NoteSequence, drop_events_n_seconds_aft
 
     max_event_time = None
     if drop_events_n_seconds_after_last_note is not None:
-        max_event_time = (max([n.end_time for n in note_sequence.notes] or [0]) +
+        max_event_time = (max((n.end_time for n in note_sequence.notes), default=0) +
                           drop_events_n_seconds_after_last_note)
 
     # Try to find a tempo at time zero. The list is not guaranteed to be in order.
@@ -232,6 +359,14 @@ def note_sequence_to_midi(note_sequence: NoteSequence, drop_events_n_seconds_aft
 
     # Populate tempos.
     # TODO - MIDI conversion: Update this code if pretty_midi adds the ability to write tempo.
+    # pm.time_to_tick needs the tick-to-time table to be rebuilt after each tempo change, which is quadratic in the
+    # number of tempos. While tempos come in time order their tick lies after the last tempo change, so it is
+    # extrapolated from it exactly as time_to_tick would do and the table is rebuilt once at the end.
+    # pylint: disable=protected-access
+    last_tick, last_tick_scale = pm._tick_scales[-1]
+    last_tick_time = 0.0
+    tempos_in_order = True
+    tick_to_time_outdated = False
     for seq_tempo in note_sequence.tempos:
         # Skip if this tempo was added in the PrettyMIDI constructor.
         if seq_tempo == initial_seq_tempo:
@@ -239,11 +374,24 @@ def note_sequence_to_midi(note_sequence: NoteSequence, drop_events_n_seconds_aft
         if max_event_time and seq_tempo.time > max_event_time:
             continue
         tick_scale = 60.0 / (pm.resolution * seq_tempo.qpm)
-        tick = pm.time_to_tick(seq_tempo.time)
-        # pylint: disable=protected-access
-        pm._tick_scales.append((tick, tick_scale))
+        if tempos_in_order and seq_tempo.time > last_tick_time:
+            tick = int(round(last_tick + (seq_tempo.time - last_tick_time) / last_tick_scale))
+            last_tick_time += last_tick_scale * (tick - last_tick)
+            last_tick, last_tick_scale = tick, tick_scale
+            pm._tick_scales.append((tick, tick_scale))
+            tick_to_time_outdated = True
+        else:
+            # Out of order tempo, fall back to the tick-to-time table from now on
+            tempos_in_order = False
+            if tick_to_time_outdated:
+                pm._update_tick_to_time(0)
+            tick = pm.time_to_tick(seq_tempo.time)
+            pm._tick_scales.append((tick, tick_scale))
+            pm._update_tick_to_time(0)
+            tick_to_time_outdated = False
+    if tick_to_time_outdated:
         pm._update_tick_to_time(0)
-        # pylint: enable=protected-access
+    # pylint: enable=protected-access
 
     # Populate instrument names by first creating an instrument map between
     # instrument index and name.
@@ -254,35 +402,38 @@ def note_sequence_to_midi(note_sequence: NoteSequence, drop_events_n_seconds_aft
 
     # Populate instrument events by first gathering notes and other event types
     # in lists then write them sorted to the PrettyMidi object.
-    instrument_events = collections.defaultdict(lambda: collections.defaultdict(list))
+    # Every (instrument, program, is_drum) key maps to its notes, bends and controls lists.
+    instrument_events = {}
     for seq_note in note_sequence.notes:
-        instrument_events[(seq_note.instrument, seq_note.program,
-                           seq_note.is_drum)]['notes'].append(
-            pretty_midi.Note(
-                seq_note.velocity, seq_note.pitch,
-                seq_note.start_time, seq_note.end_time))
+        key = (seq_note.instrument, seq_note.program, seq_note.is_drum)
+        events = instrument_events.get(key)
+        if events is None:
+            events = instrument_events[key] = ([], [], [])
+        events[0].append(pretty_midi.Note(seq_note.velocity, seq_note.pitch, seq_note.start_time, seq_note.end_time))
     for seq_bend in note_sequence.pitch_bends:
         if max_event_time and seq_bend.time > max_event_time:
             continue
-        instrument_events[(seq_bend.instrument, seq_bend.program,
-                           seq_bend.is_drum)]['bends'].append(
-            pretty_midi.PitchBend(seq_bend.bend, seq_bend.time))
+        key = (seq_bend.instrument, seq_bend.program, seq_bend.is_drum)
+        events = instrument_events.get(key)
+        if events is None:
+            events = instrument_events[key] = ([], [], [])
+        events[1].append(pretty_midi.PitchBend(seq_bend.bend, seq_bend.time))
     for seq_cc in note_sequence.control_changes:
         if max_event_time and seq_cc.time > max_event_time:
             continue
-        instrument_events[(seq_cc.instrument, seq_cc.program,
-                           seq_cc.is_drum)]['controls'].append(
-            pretty_midi.ControlChange(
-                seq_cc.control_number,
-                seq_cc.control_value, seq_cc.time))
+        key = (seq_cc.instrument, seq_cc.program, seq_cc.is_drum)
+        events = instrument_events.get(key)
+        if events is None:
+            events = instrument_events[key] = ([], [], [])
+        events[2].append(pretty_midi.ControlChange(seq_cc.control_number, seq_cc.control_value, seq_cc.time))
 
-    for (instr_id, prog_id, is_drum) in sorted(instrument_events.keys()):
+    for (instr_id, prog_id, is_drum), (notes, bends, controls) in sorted(instrument_events.items()):
         # For instr_id 0 append to the instrument created above.
         if instr_id > 0:
             if is_drum:
                 name = 'Drums'
             else:
-                name = pretty_midi.program_to_instrument_name(prog_id)
+                name = _program_to_instrument_name(prog_id)
             instrument = pretty_midi.Instrument(prog_id, is_drum, name)
             pm.instruments.append(instrument)
         else:
@@ -291,12 +442,9 @@ def note_sequence_to_midi(note_sequence: NoteSequence, drop_events_n_seconds_aft
         instrument.program = prog_id
         if instr_id in inst_infos:
             instrument.name = inst_infos[instr_id]
-        instrument.notes = instrument_events[
-            (instr_id, prog_id, is_drum)]['notes']
-        instrument.pitch_bends = instrument_events[
-            (instr_id, prog_id, is_drum)]['bends']
-        instrument.control_changes = instrument_events[
-            (instr_id, prog_id, is_drum)]['controls']
+        instrument.notes = notes
+        instrument.pitch_bends = bends
+        instrument.control_changes = controls
 
     return pm
 
@@ -1,10 +1,12 @@
 """ This module provides utility functions for working with NoteSequence I/O. """
-import collections
 import hashlib
 from typing import Dict, Any
 
 from resolv_mir.protobuf import NoteSequence, SequenceMetadata
 
+# The fingerprint is only used as an identifier, SHA-1 is kept so that IDs stay stable across versions.
+_sha1 = hashlib.sha1
+
 
 def generate_note_sequence_id(filename, collection_name, source_type):
     """Generates a unique ID for a sequence.
@@ -20,23 +22,23 @@ def generate_note_sequence_id(filename, collection_name, source_type):
     Returns:
       The generated sequence ID as a string.
     """
-    filename_fingerprint = hashlib.sha1(filename.encode('utf-8'))
+    filename_fingerprint = _sha1(filename.encode('utf-8'), usedforsecurity=False)
     return f'/id/{source_type.lower()}/{collection_name}/{filename_fingerprint.hexdigest()}'
 
 
 def populate_sequence_metadata(sequence: NoteSequence, source_type: str, metadata: Dict[str, Any]):
     if metadata:
-        dict_metadata = collections.defaultdict(lambda: "")
-        dict_metadata.update(metadata)
-        sequence.id = generate_note_sequence_id(dict_metadata['id'], dict_metadata['collection_name'], source_type)
-        sequence.filepath = dict_metadata['filepath']
-        sequence.collection_name = dict_metadata['collection_name']
-        sequence.reference_number = dict_metadata['reference_number'] if dict_metadata['reference_number'] else 0
+        get_metadata = metadata.get
+        collection_name = get_metadata('collection_name', '')
+        sequence.id = generate_note_sequence_id(get_metadata('id', ''), collection_name, source_type)
+        sequence.filepath = get_metadata('filepath', '')
+        sequence.collection_name = collection_name
+        sequence.reference_number = get_metadata('reference_number') or 0
         sequence_metadata = SequenceMetadata(
-            title=dict_metadata['title'],
-            artist=dict_metadata['artist'],
-            genre=dict_metadata['genre']
+            title=get_metadata('title', ''),
+            artist=get_metadata('artist', ''),
+            genre=get_metadata('genre', '')
         )
-        sequence_metadata.composers.append(dict_metadata['composer'])
+        sequence_metadata.composers.append(get_metadata('composer', ''))
         sequence.sequence_metadata.CopyFrom(sequence_metadata)
     return sequence
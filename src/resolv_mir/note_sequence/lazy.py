@@ -0,0 +1,36 @@
+""" This module provides the lazy import of the submodules of a package on first access (PEP 562).
+
+It only depends on the standard library, so that importing a package using it does not pay for importing any of its
+submodules.
+"""
+import importlib
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+
+def lazy_submodules(package_globals: Dict[str, Any],
+                    submodules: Sequence[str]) -> Tuple[Callable[[str], Any], Callable[[], List[str]]]:
+    """ Builds the module-level __getattr__ and __dir__ functions importing the given submodules of a package lazily.
+
+    A submodule is imported on the first access to the attribute of the package with its name, and is then stored in
+    the package globals, so that the following accesses do not go through __getattr__.
+
+    Args:
+        package_globals (Dict[str, Any]): The globals of the package, as returned by globals() in its __init__.
+        submodules (Sequence[str]): The names of the submodules to import lazily.
+
+    Returns:
+        (Tuple[Callable[[str], Any], Callable[[], List[str]]]): The __getattr__ and __dir__ functions of the package.
+    """
+    package_name = package_globals['__name__']
+
+    def __getattr__(name):
+        if name in submodules:
+            module = importlib.import_module(f'.{name}', package_name)
+            package_globals[name] = module
+            return module
+        raise AttributeError(f'module {package_name!r} has no attribute {name!r}')
+
+    def __dir__():
+        return sorted(set(package_globals) | set(submodules))
+
+    return __getattr__, __dir__
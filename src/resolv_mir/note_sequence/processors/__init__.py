@@ -7,12 +7,18 @@ Description: Package providing various operations on NoteSequences.
 Copyright (c) 2024, Matteo Pettenò
 License: Apache License 2.0 (https://www.apache.org/licenses/LICENSE-2.0)
 """
-from . import extender
-from . import extractor
-from . import quantizer
-from . import slicer
-from . import splitter
-from . import stretcher
-from . import sustainer
-from . import transposer
-from . import truncator
+from ..lazy import lazy_submodules
+
+# Submodules are imported lazily on first access (PEP 562), so that using a single processor does not pay for
+# importing all the others.
+__getattr__, __dir__ = lazy_submodules(globals(), (
+    'extender',
+    'extractor',
+    'quantizer',
+    'slicer',
+    'splitter',
+    'stretcher',
+    'sustainer',
+    'transposer',
+    'truncator'
+))
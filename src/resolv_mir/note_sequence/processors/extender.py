@@ -17,21 +17,12 @@ def extend_quantized_sequence_with_silence(note_sequence: NoteSequence):
     Raises:
         QuantizationStatusError: If note_sequence is not quantized relative to tempo.
     """
-    def _get_silence(end_step):
-        s = NoteSequence.Note()
-        s.start_time = note_sequence.total_quantized_steps / steps_per_second
-        s.end_time = end_step / steps_per_second
-        s.quantized_start_step = note_sequence.total_quantized_steps
-        s.quantized_end_step = end_step
-        s.velocity = 0
-        return s
-
-    utilities.assert_is_relative_quantized_sequence(note_sequence)
-    steps_per_bar = utilities.steps_per_bar_in_quantized_sequence(note_sequence)
-    steps_per_second = note_sequence.quantization_info.steps_per_second
-    silence_end_step = utilities.bars_in_quantized_sequence(note_sequence) * steps_per_bar
-    if silence_end_step != note_sequence.total_quantized_steps:
-        silence = _get_silence(silence_end_step)
-        note_sequence.notes.append(silence)
-        note_sequence.total_quantized_steps = silence.quantized_end_step
-        note_sequence.total_time = silence.end_time
+    steps_per_bar, bar_count, steps_per_second, total_steps = utilities.quantization_geometry(note_sequence)
+    silence_end_step = int(bar_count * steps_per_bar)
+    # Nothing to do if the sequence already ends on a bar boundary
+    if silence_end_step != total_steps:
+        silence_end_time = silence_end_step / steps_per_second
+        note_sequence.notes.add(start_time=total_steps / steps_per_second, end_time=silence_end_time,
+                                quantized_start_step=total_steps, quantized_end_step=silence_end_step, velocity=0)
+        note_sequence.total_quantized_steps = silence_end_step
+        note_sequence.total_time = silence_end_time
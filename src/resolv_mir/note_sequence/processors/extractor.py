@@ -1,7 +1,8 @@
 """ This processor module contains functions used to extract subsequences from a NoteSequence proto. """
-import copy
 import logging
-from typing import List, Tuple, Dict, Any
+import math
+import operator
+from typing import List, Tuple, Dict, Any, Collection
 
 import numpy as np
 
@@ -20,7 +21,7 @@ def extract_melodies_from_note_sequence(quantized_sequence: NoteSequence,
                                         gap_bars: int = 1,
                                         ignore_polyphonic_notes: bool = False,
                                         filter_drums: bool = True,
-                                        valid_programs: List[int] = constants.MEL_PROGRAMS) -> List[NoteSequence]:
+                                        valid_programs: Collection[int] = constants.MEL_PROGRAMS) -> List[NoteSequence]:
     """ Extracts a list of melodies from the given quantized NoteSequence.
 
     This function will search through quantized_sequence for monophonic melodies in every track at every time step.
@@ -62,7 +63,7 @@ def extract_melodies_from_note_sequence(quantized_sequence: NoteSequence,
         ignore_polyphonic_notes (bool): If True, melodies will be extracted from quantized_sequence tracks that contain
             polyphony (notes start at the same time). If False, tracks with polyphony will be ignored.
         filter_drums (bool): If True, notes for which is_drum is True will be ignored.
-        valid_programs (List[int]): Notes whose program is not in this list will be ignored.
+        valid_programs (Collection[int]): Notes whose program is not in this collection will be ignored.
 
     Returns:
         melodies: A python list of Melody instances.
@@ -93,24 +94,26 @@ def extract_melodies_from_note_sequence(quantized_sequence: NoteSequence,
         raise ValueError('min_pitch should be <= max_pitch')
     utilities.assert_is_relative_quantized_sequence(quantized_sequence)
 
+    # Programs are checked for every note, so the set is built once here and not again for every melody
+    valid_programs = frozenset(valid_programs)
     melodies: List[NoteSequence] = []
     stats = _init_stats()
     instruments = set(n.instrument for n in quantized_sequence.notes)
     steps_per_bar = int(utilities.steps_per_bar_in_quantized_sequence(quantized_sequence))
+    # The sequence data shared by all the melodies is copied once and each melody starts as a copy of it
+    melody_template = _melody_template(quantized_sequence)
     for instrument in instruments:
+        # The candidate notes of the instrument are filtered and sorted once for all its melodies. Each melody search
+        # then skips to the first note starting at or after its search start step with a binary search.
+        notes, notes_start_steps = _melody_candidate_notes(quantized_sequence, instrument, min_pitch, max_pitch,
+                                                           valid_programs)
         instrument_search_start_step = search_start_step
         while True:
             try:
-                melody = processors.extractor.extract_melody_from_note_sequence(
-                    quantized_sequence,
-                    instrument=instrument,
-                    search_start_step=instrument_search_start_step,
-                    gap_bars=gap_bars,
-                    min_pitch=min_pitch,
-                    max_pitch=max_pitch,
-                    ignore_polyphonic_notes=ignore_polyphonic_notes,
-                    filter_drums=filter_drums,
-                    valid_programs=valid_programs)
+                first_note_idx = np.searchsorted(notes_start_steps, instrument_search_start_step)
+                melody = _extract_melody(quantized_sequence, notes[first_note_idx:], instrument_search_start_step,
+                                         instrument, gap_bars, ignore_polyphonic_notes, filter_drums, valid_programs,
+                                         melody_template)
             except exceptions.PolyphonicMelodyError:
                 stats['polyphonic_tracks_discarded'].increment()
                 break  # Look for monophonic melodies in other tracks.
@@ -142,9 +145,10 @@ def extract_melodies_from_note_sequence(quantized_sequence: NoteSequence,
                 stats['melodies_discarded_too_long'].increment()
                 continue
 
-            # Require a certain number of unique pitches.
-            note_histogram = utilities.get_note_pitches_histogram_for_note_sequence(melody)
-            unique_pitches = np.count_nonzero(note_histogram)
+            # Require a certain number of unique pitches (with octave equivalence). Only their count is needed, so the
+            # pitch classes are collected in a set instead of building the pitches histogram.
+            unique_pitches = len({note.pitch % constants.NOTES_PER_OCTAVE for note in melody.notes
+                                  if note.pitch >= constants.MIN_MIDI_PITCH})
             if unique_pitches < min_unique_pitches:
                 stats['melodies_discarded_too_few_pitches'].increment()
                 continue
@@ -166,7 +170,7 @@ def extract_melody_from_note_sequence(quantized_sequence: NoteSequence,
                                       gap_bars: int = 1,
                                       ignore_polyphonic_notes: bool = False,
                                       filter_drums: bool = True,
-                                      valid_programs: List[int] = constants.MEL_PROGRAMS) -> NoteSequence:
+                                      valid_programs: Collection[int] = constants.MEL_PROGRAMS) -> NoteSequence:
     """ Extract a melody from the given quantized NoteSequence.
 
     A monophonic melody is extracted from the given instrument starting at search_start_step. instrument and
@@ -191,24 +195,292 @@ def extract_melody_from_note_sequence(quantized_sequence: NoteSequence,
         ignore_polyphonic_notes (bool): If True, the highest pitch is used in the melody when multiple notes start at
             the same time. If False, PolyphonicMelodyError will be raised if multiple notes start at the same time.
         filter_drums (bool): If True, notes for which `is_drum` is True will be ignored.
-        valid_programs (List[int]): Notes whose program is not in this list will be ignored.
+        valid_programs (Collection[int]): Notes whose program is not in this collection will be ignored.
 
     Raises:
         QuantizationStatusError: If note_sequence is not quantized relative to tempo.
         PolyphonicMelodyError: If any of the notes start on the same step and `ignore_polyphonic_notes` is False.
     """
 
+    if min_pitch > max_pitch:
+        raise ValueError('min_pitch should be <= max_pitch')
+    utilities.assert_is_relative_quantized_sequence(quantized_sequence)
+    # Programs are checked for every note and event (a frozenset is returned as is)
+    valid_programs = frozenset(valid_programs)
+
+    notes, notes_start_steps = _melody_candidate_notes(quantized_sequence, instrument, min_pitch, max_pitch,
+                                                       valid_programs)
+    # Filter notes by search start step. Notes are sorted by start step, so they are the ones from the first note
+    # starting at or after search_start_step.
+    notes = notes[np.searchsorted(notes_start_steps, search_start_step):]
+    return _extract_melody(quantized_sequence, notes, search_start_step, instrument, gap_bars, ignore_polyphonic_notes,
+                           filter_drums, valid_programs)
+
+
+def extract_ngrams_from_note_sequence(note_sequence: NoteSequence, n: int = 2) -> List[NoteSequence]:
+    """ Extracts n-grams from a given NoteSequence.
+    Currently, the function extracts n-grams with a fixed stride window of 1.
+
+    Args:
+        note_sequence (NoteSequence): The input NoteSequence from which n-grams are to be extracted.
+        n (int, optional): The size of the n-grams to extract. Defaults to 2.
+
+    Returns:
+        List[NoteSequence]: A list of NoteSequence objects representing the extracted n-grams.
+    """
+    if not note_sequence.notes:
+        return []
+
+    # TODO - Ngrams extraction: parametrize the stride window for extracting the ngrams (now it is fixed to 1)
+    # The n-gram starting at note i spans from the start of note i to the end of note i + n - 1. The note times are
+    # read once and zip stops at the last complete n-gram.
+    notes = note_sequence.notes
+    start_times = [note.start_time for note in notes]
+    end_times = [note.end_time for note in notes]
+    subsequences_intervals: List[Tuple[float, float]] = list(zip(start_times, end_times[n - 1:]))
+
+    return extract_subsequences(note_sequence, subsequences_intervals) if subsequences_intervals else []
+
+
+def extract_repetitive_subsequences(sequence: NoteSequence, min_repetitions: int = 2) -> List[NoteSequence]:
+    """ Extracts repetitive subsequences from a given NoteSequence.
+    Repetitive subsequences are defined as consecutive subsequences of notes that are identical in pitch (see function
+    equal_notes in the utilities module). The function identifies repetitive subsequences by comparing consecutive notes
+    in the input sequence and a subsequence is considered repetitive if it repeats at least min_repetitions times
+    consecutively. Subsequences that do not meet the minimum repetitions requirement are discarded.
+
+    Args:
+        sequence (NoteSequence): The input NoteSequence from which repetitive subsequences are to be extracted.
+        min_repetitions (int, optional): The minimum number of repetitions required for a subsequence to be considered
+            repetitive. Defaults to 2.
+
+    Returns:
+        List[NoteSequence]: A list of NoteSequence objects representing the extracted repetitive subsequences.
+     """
+    subsequences_intervals = _repetitive_subsequences_intervals(sequence, min_repetitions)
+    return extract_subsequences(sequence, subsequences_intervals) if subsequences_intervals else []
+
+
+def extract_repetitive_subsequences_lengths(sequence: NoteSequence, min_repetitions: int = 2) -> np.ndarray:
+    """ Computes the number of notes of the repetitive subsequences of a given NoteSequence.
+    The repetitive subsequences are the same ones returned by extract_repetitive_subsequences, but only the number of
+    notes that each of them would contain is computed, without building the subsequences.
+
+    Args:
+        sequence (NoteSequence): The input NoteSequence from which repetitive subsequences are to be extracted.
+        min_repetitions (int, optional): The minimum number of repetitions required for a subsequence to be considered
+            repetitive. Defaults to 2.
+
+    Returns:
+        np.ndarray: An integer array with the number of notes of each repetitive subsequence.
+     """
+    subsequences_intervals = _repetitive_subsequences_intervals(sequence, min_repetitions)
+    notes = sequence.notes
+    start_times = np.fromiter((n.start_time for n in notes), dtype=np.float64, count=len(notes))
+    lengths = np.empty(len(subsequences_intervals), dtype=np.int64)
+    for idx, (subsequence_start_time, subsequence_end_time) in enumerate(subsequences_intervals):
+        # Same interval check done by extract_subsequences: start <= note start time < end (with float tolerance)
+        after_start = (start_times > subsequence_start_time) | _float_equal_array(start_times, subsequence_start_time)
+        before_end = (start_times < subsequence_end_time) & ~_float_equal_array(start_times, subsequence_end_time)
+        lengths[idx] = np.count_nonzero(after_start & before_end)
+    # Empty subsequences are filtered by extract_subsequences
+    return lengths[lengths > 0]
+
+
+def extract_subsequences(sequence: NoteSequence, subsequences_intervals: List[Tuple[float, float]],
+                         preserve_control_numbers: List[int] = None) -> List[NoteSequence]:
+    """ Extracts subsequences from a given NoteSequence based on specified intervals.
+    This function preserves the state of time signatures, key signatures, tempos, and chord changes
+    across the subsequences.
+
+    Args:
+        sequence (NoteSequence): The input NoteSequence from which subsequences are to be extracted.
+        subsequences_intervals (List[Tuple[float, float]]): A list of tuples representing start and end times
+            in seconds defining the intervals from which subsequences will be extracted.
+        preserve_control_numbers (List[int], optional): A list of control numbers to be preserved when extracting
+            control changes (e.g., pedal events). Defaults to None.
+
+    Returns:
+        List[NoteSequence]: A list of NoteSequence objects representing the extracted subsequences.
+
+    Raises:
+        ValueError: If subsequences_intervals is empty or if any interval extends past the end of the sequence.
+    """
+    if not subsequences_intervals:
+        raise ValueError('Must provide at least a start and end time.')
+    if any(utilities.float_great(time, sequence.total_time) for time in [e for t in subsequences_intervals for e in t]):
+        raise ValueError('Cannot extract subsequence past end of sequence.')
+
+    if preserve_control_numbers is None:
+        preserve_control_numbers = constants.DEFAULT_SUBSEQUENCE_PRESERVE_CONTROL_NUMBERS
+
+    # Init subsequences
+    # The events are added below, so they are not copied at all
+    subsequence = _copy_sequence_without_fields(sequence, ('notes', 'time_signatures', 'key_signatures', 'tempos',
+                                                           'text_annotations', 'control_changes', 'pitch_bends'))
+    subsequence.total_time = 0.0
+    subsequences = [NoteSequence() for _ in range(len(subsequences_intervals))]
+    for new_subsequence in subsequences:
+        new_subsequence.CopyFrom(subsequence)
+
+    # Sort subsequences intervals by start time
+    subsequences_intervals = sorted(subsequences_intervals, key=operator.itemgetter(0))
+
+    # Extract notes into subsequences. Notes are sorted by start time, so the notes in the interval of a subsequence
+    # are a contiguous range of them, whose bounds are found with a binary search.
+    # The note times are read once into lists and the new times and the total time are computed from them, so the
+    # notes are only accessed to be copied.
+    notes = sorted(sequence.notes, key=operator.attrgetter('start_time'))
+    notes_start_times = [n.start_time for n in notes]
+    notes_end_times = [n.end_time for n in notes]
+    for current_subsequence, (subsequence_start_time, subsequence_end_time) in zip(subsequences,
+                                                                                  subsequences_intervals):
+        first_note_idx = utilities.bisect_float_left(notes_start_times, subsequence_start_time)
+        end_note_idx = utilities.bisect_float_left(notes_start_times, subsequence_end_time)
+        total_time = current_subsequence.total_time
+        for note, start_time, end_time in zip(notes[first_note_idx:end_note_idx],
+                                              notes_start_times[first_note_idx:end_note_idx],
+                                              notes_end_times[first_note_idx:end_note_idx]):
+            new_note = current_subsequence.notes.add()
+            new_note.CopyFrom(note)
+            new_note.start_time = start_time - subsequence_start_time
+            # Truncate end time if the note continue after subsequence end time
+            new_end_time = min(end_time, subsequence_end_time) - subsequence_start_time
+            new_note.end_time = new_end_time
+            if utilities.float_great(new_end_time, total_time):
+                total_time = new_end_time
+        current_subsequence.total_time = total_time
+
+    # Extract time signatures, key signatures, tempos, and chord changes (beats are handled below, other text
+    # annotations and pitch bends are deleted). Additional state events will be added to the beginning of each
+    # subsequence. Chord and beat annotations are split in a single pass over the text annotations.
+    chord_annotations: List[NoteSequence.TextAnnotation] = []
+    beat_annotations: List[NoteSequence.TextAnnotation] = []
+    for annotation in sequence.text_annotations:
+        if annotation.annotation_type == NoteSequence.TextAnnotation.CHORD_SYMBOL:
+            chord_annotations.append(annotation)
+        elif annotation.annotation_type == NoteSequence.TextAnnotation.BEAT:
+            beat_annotations.append(annotation)
+    events_by_type = [sequence.time_signatures, sequence.key_signatures, sequence.tempos, chord_annotations]
+    # Events are sorted by time, so the events in the interval of a subsequence are a contiguous range of them and the
+    # state before the interval is given by the event right before that range. The events of each type are sorted once
+    # and all the types are then handled in a single pass over the subsequences (types without events are skipped).
+    sorted_events_by_type = []
+    for container_name, events in zip(('time_signatures', 'key_signatures', 'tempos', 'text_annotations'),
+                                      events_by_type):
+        if events:
+            events = sorted(events, key=operator.attrgetter('time'))
+            sorted_events_by_type.append((container_name, events, [e.time for e in events]))
+    for subsequence, (subsequence_start_time, subsequence_end_time) in zip(subsequences, subsequences_intervals):
+        for container_name, events, events_times in sorted_events_by_type:
+            container = getattr(subsequence, container_name)
+            first_event_idx = utilities.bisect_float_left(events_times, subsequence_start_time)
+            end_event_idx = utilities.bisect_float_left(events_times, subsequence_end_time)
+            # Only add the events actually inside the subsequence (and not on the boundary with the next one)
+            for event in events[first_event_idx:end_event_idx]:
+                new_event = container.add()
+                new_event.CopyFrom(event)
+                new_event.time = event.time - subsequence_start_time
+            # Add the state event to the beginning of the subsequence only if the container is empty (e.g. previous
+            # state is still valid)
+            if first_event_idx > 0 and not container:
+                new_event = container.add()
+                new_event.CopyFrom(events[first_event_idx - 1])
+                new_event.time = 0.0
+
+    # Copy stateless events to subsequences. Unlike the stateful events above, stateless events do not have an effect
+    # outside the subsequence in which they occur.
+    if beat_annotations:
+        beat_annotations.sort(key=operator.attrgetter('time'))
+        beat_annotations_times = [a.time for a in beat_annotations]
+        for subsequence, (subsequence_start_time, subsequence_end_time) in zip(subsequences, subsequences_intervals):
+            first_event_idx = utilities.bisect_float_left(beat_annotations_times, subsequence_start_time)
+            end_event_idx = utilities.bisect_float_left(beat_annotations_times, subsequence_end_time)
+            for event in beat_annotations[first_event_idx:end_event_idx]:
+                new_event = subsequence.text_annotations.add()
+                new_event.CopyFrom(event)
+                new_event.time = event.time - subsequence_start_time
+
+    # Extract piano pedal events (other control changes are deleted). Pedal state is maintained per-instrument and
+    # added to the beginning of each subsequence.
+    pedal_events = [cc for cc in sequence.control_changes if cc.control_number in preserve_control_numbers]
+    if pedal_events:
+        pedal_events.sort(key=operator.attrgetter('time'))
+        pedal_events_times = [e.time for e in pedal_events]
+        # Intervals are sorted by start time, so the pedal state before each of them is kept up to date by applying the
+        # pedal events in between to the state before the previous interval
+        previous_pedal_events: Dict[Tuple[int, int], NoteSequence.ControlChange] = {}
+        previous_pedal_event_idx = 0
+        for subsequence, (subsequence_start_time, subsequence_end_time) in zip(subsequences, subsequences_intervals):
+            first_event_idx = utilities.bisect_float_left(pedal_events_times, subsequence_start_time)
+            end_event_idx = utilities.bisect_float_left(pedal_events_times, subsequence_end_time)
+            for pedal_event in pedal_events[previous_pedal_event_idx:first_event_idx]:
+                previous_pedal_events[(pedal_event.instrument, pedal_event.control_number)] = pedal_event
+            previous_pedal_event_idx = max(previous_pedal_event_idx, first_event_idx)
+            interval_pedal_events = pedal_events[first_event_idx:end_event_idx]
+            # The previous state is added before the events of the subsequence, since events at the same time are not
+            # applied in order. It is skipped for the pedals that change right at the beginning of the subsequence,
+            # otherwise the stale state would be applied together with the new one.
+            start_pedal_keys = {(e.instrument, e.control_number) for e in interval_pedal_events
+                                if utilities.float_equal(e.time, subsequence_start_time)}
+            for pedal_key, pedal_event in previous_pedal_events.items():
+                if pedal_key not in start_pedal_keys:
+                    new_pedal_event = subsequence.control_changes.add()
+                    new_pedal_event.CopyFrom(pedal_event)
+                    new_pedal_event.time = 0.0
+            for pedal_event in interval_pedal_events:
+                new_pedal_event = subsequence.control_changes.add()
+                new_pedal_event.CopyFrom(pedal_event)
+                new_pedal_event.time = pedal_event.time - subsequence_start_time
+
+    # Quantize subsequences if necessary. The subsequences are new protos, so they are quantized in place.
+    if utilities.is_absolute_quantized_sequence(sequence):
+        steps_per_second = sequence.quantization_info.steps_per_second
+        for subsequence in subsequences:
+            processors.quantizer.quantize_note_sequence_absolute(subsequence, steps_per_second, in_place=True)
+    elif utilities.is_relative_quantized_sequence(sequence):
+        steps_per_quarter = sequence.quantization_info.steps_per_quarter
+        for subsequence in subsequences:
+            processors.quantizer.quantize_note_sequence(subsequence, steps_per_quarter, in_place=True)
+
+    # Set subsequence info for all subsequences.
+    for subsequence, start_time in [(x, y) for x, (y, _) in zip(subsequences, subsequences_intervals)]:
+        subsequence.subsequence_info.start_time_offset = start_time
+        subsequence.subsequence_info.end_time_offset = (sequence.total_time - start_time - subsequence.total_time)
+
+    # Filter empty subsequences
+    subsequences = [subsequence for subsequence in subsequences if subsequence.notes]
+
+    return subsequences
+
+
+def _melody_candidate_notes(quantized_sequence: NoteSequence, instrument: int, min_pitch: int, max_pitch: int,
+                            valid_programs: Collection[int]) -> Tuple[List[NoteSequence.Note], np.ndarray]:
+    # Filter notes by instrument, program and pitch
+    notes = [n for n in quantized_sequence.notes if n.instrument == instrument and n.program in valid_programs and
+             min_pitch <= n.pitch <= max_pitch]
+    # Sort track by note start times, and secondarily by pitch descending. Sorts are stable (also in reverse), so this
+    # is done with two sorts on single fields, whose keys are read by attrgetter without building a tuple per note.
+    notes.sort(key=operator.attrgetter('pitch'), reverse=True)
+    notes.sort(key=operator.attrgetter('quantized_start_step'))
+    notes_start_steps = np.fromiter(map(operator.attrgetter('quantized_start_step'), notes), dtype=np.int64,
+                                    count=len(notes))
+    return notes, notes_start_steps
+
+
+def _extract_melody(quantized_sequence: NoteSequence, notes: List[NoteSequence.Note], search_start_step: int,
+                    instrument: int, gap_bars: int, ignore_polyphonic_notes: bool, filter_drums: bool,
+                    valid_programs: Collection[int], melody_template: NoteSequence = None) -> NoteSequence:
+    # Extract the melody from the candidate notes starting at or after search_start_step, sorted by start step and
+    # secondarily by pitch descending. If given, melody_template is the _melody_template of quantized_sequence.
     def _copy_note_to_melody(target_melody, old_note, start_s, end_s, start_t, end_t):
-        new_note = copy.deepcopy(old_note)
+        new_note = target_melody.notes.add()
+        new_note.CopyFrom(old_note)
         new_note.start_time = start_t
         new_note.end_time = end_t
         new_note.quantized_start_step = start_s
         new_note.quantized_end_step = end_s
-        target_melody.notes.append(new_note)
-
-    if min_pitch > max_pitch:
-        raise ValueError('min_pitch should be <= max_pitch')
-    utilities.assert_is_relative_quantized_sequence(quantized_sequence)
+        return new_note
 
     steps_per_bar_float = utilities.steps_per_bar_in_quantized_sequence(quantized_sequence)
     time_signature = quantized_sequence.time_signatures[0]
@@ -220,25 +492,18 @@ def extract_melody_from_note_sequence(quantized_sequence: NoteSequence,
     steps_per_bar = int(steps_per_bar_float)
     steps_per_second = utilities.steps_per_second_in_quantized_sequence(quantized_sequence)
 
-    # Filter notes by search start step and instruments
-    notes = [n for n in quantized_sequence.notes if n.instrument == instrument and n.program in valid_programs and
-             n.quantized_start_step >= search_start_step and min_pitch <= n.pitch <= max_pitch]
-    # Sort track by note start times, and secondarily by pitch descending.
-    notes = sorted(notes, key=lambda n: (n.quantized_start_step, -n.pitch))
-
     if not notes:
         return None
 
-    melody = copy.deepcopy(quantized_sequence)
-    del melody.text_annotations[:]
-    del melody.pitch_bends[:]
-    del melody.control_changes[:]
-    del melody.instrument_infos[:]
-    del melody.notes[:]
+    melody = NoteSequence()
+    melody.CopyFrom(melody_template if melody_template is not None else _melody_template(quantized_sequence))
 
     melody_start_step = notes[0].quantized_start_step - (
             notes[0].quantized_start_step - search_start_step) % steps_per_bar
     melody_start_time = melody_start_step / steps_per_second
+    gap_steps = gap_bars * steps_per_bar
+    # The last note added to the melody is kept, so that the loop does not read it back from the melody at every note
+    last_note: NoteSequence.Note = None
     for note in notes:
         # Filter drums and Ignore 0 velocity notes.
         if (filter_drums and note.is_drum) or not note.velocity:
@@ -250,14 +515,14 @@ def extract_melody_from_note_sequence(quantized_sequence: NoteSequence,
         note_end_step = note.quantized_end_step - melody_start_step
         note_end_time = note_end_step / steps_per_second
 
-        if not melody.notes:
+        if last_note is None:
             # If there are no events, we don't need to check for polyphony.
-            _copy_note_to_melody(melody, note, note_start_step, note_end_step, note_start_time, note_end_time)
+            last_note = _copy_note_to_melody(melody, note, note_start_step, note_end_step, note_start_time,
+                                             note_end_time)
             continue
 
         # If `start_index` comes before or lands on an already added note's start step, we cannot add it. In that case
         # either discard the melody or keep the highest pitch.
-        last_note: NoteSequence.Note = melody.notes[-1]
         on_distance = note_start_step - last_note.quantized_start_step
         off_distance = note_end_step - last_note.quantized_end_step
         if on_distance == 0:
@@ -274,7 +539,7 @@ def extract_melody_from_note_sequence(quantized_sequence: NoteSequence,
             raise exceptions.PolyphonicMelodyError('Unexpected note. Not in ascending order.')
 
         # If a gap of `gap` or more steps is found, end the melody.
-        if len(melody.notes) and off_distance >= gap_bars * steps_per_bar:
+        if off_distance >= gap_steps:
             break
 
         # End any sustained notes.
@@ -283,92 +548,39 @@ def extract_melody_from_note_sequence(quantized_sequence: NoteSequence,
             last_note.end_time = note_start_time
 
         # Add the note-on and off events to the melody.
-        _copy_note_to_melody(melody, note, note_start_step, note_end_step, note_start_time, note_end_time)
+        last_note = _copy_note_to_melody(melody, note, note_start_step, note_end_step, note_start_time, note_end_time)
 
-    if not melody.notes:
+    if last_note is None:
         # If no notes were added, don't set `_start_step` and `_end_step`.
         return None
     else:
         # Populate melody info and annotations from original sequence
-        melody.total_quantized_steps = melody.notes[-1].quantized_end_step
-        melody.total_time = melody.notes[-1].end_time
-
-    # Populate Control Change events
-    for cc in quantized_sequence.control_changes:
-        if (utilities.float_less_or_equal(melody_start_time, cc.time) and
-                utilities.float_less(cc.time, melody.total_time) and cc.instrument == instrument
-                and cc.program in valid_programs):
-            new_cc = copy.deepcopy(cc)
-            melody.control_changes.append(new_cc)
-
-    # Populate Pitch Bend events
-    for pb in quantized_sequence.pitch_bends:
-        if (utilities.float_less_or_equal(melody_start_time, pb.time) and
-                utilities.float_less(pb.time, melody.total_time) and pb.instrument == instrument
-                and pb.program in valid_programs):
-            new_pb = copy.deepcopy(pb)
-            melody.pitch_bends.append(new_pb)
-
-    # Populate Instrument Infos
-    for ii in quantized_sequence.instrument_infos:
-        if ii.instrument == instrument:
-            new_ii = copy.deepcopy(ii)
-            melody.instrument_infos.append(new_ii)
-
-    # Populate Text Annotation
-    for ta in quantized_sequence.text_annotations:
-        if (utilities.float_less_or_equal(melody_start_time, ta.time) and
-                utilities.float_less(ta.time, melody.total_time)):
-            new_ta = copy.deepcopy(ta)
-            melody.pitch_bends.append(new_ta)
+        melody.total_quantized_steps = last_note.quantized_end_step
+        melody.total_time = last_note.end_time
+
+    melody_end_time = melody.total_time
+
+    # Populate Control Change, Pitch Bend, Instrument Info and Text Annotation events. The events of each type are
+    # filtered and copied to the melody with a single extend.
+    melody.control_changes.extend([cc for cc in quantized_sequence.control_changes
+                                   if cc.instrument == instrument and cc.program in valid_programs and
+                                   _time_in_interval(cc.time, melody_start_time, melody_end_time)])
+    melody.pitch_bends.extend([pb for pb in quantized_sequence.pitch_bends
+                               if pb.instrument == instrument and pb.program in valid_programs and
+                               _time_in_interval(pb.time, melody_start_time, melody_end_time)])
+    melody.instrument_infos.extend([ii for ii in quantized_sequence.instrument_infos if ii.instrument == instrument])
+    melody.text_annotations.extend([ta for ta in quantized_sequence.text_annotations
+                                    if _time_in_interval(ta.time, melody_start_time, melody_end_time)])
 
     return melody
 
 
-def extract_ngrams_from_note_sequence(note_sequence: NoteSequence, n: int = 2) -> List[NoteSequence]:
-    """ Extracts n-grams from a given NoteSequence.
-    Currently, the function extracts n-grams with a fixed stride window of 1.
-
-    Args:
-        note_sequence (NoteSequence): The input NoteSequence from which n-grams are to be extracted.
-        n (int, optional): The size of the n-grams to extract. Defaults to 2.
-
-    Returns:
-        List[NoteSequence]: A list of NoteSequence objects representing the extracted n-grams.
-    """
-    if not note_sequence.notes:
-        return []
-
-    # TODO - Ngrams extraction: parametrize the stride window for extracting the ngrams (now it is fixed to 1)
-    subsequences_intervals: List[Tuple[float, float]] = []
-    for i in range(len(note_sequence.notes) - n + 1):
-        subsequence_start_time = note_sequence.notes[i].start_time
-        subsequence_end_time = note_sequence.notes[i + n - 1].end_time
-        subsequences_intervals.append((subsequence_start_time, subsequence_end_time))
-
-    return extract_subsequences(note_sequence, subsequences_intervals) if subsequences_intervals else []
-
-
-def extract_repetitive_subsequences(sequence: NoteSequence, min_repetitions: int = 2) -> List[NoteSequence]:
-    """ Extracts repetitive subsequences from a given NoteSequence.
-    Repetitive subsequences are defined as consecutive subsequences of notes that are identical in pitch (see function
-    equal_notes in the utilities module). The function identifies repetitive subsequences by comparing consecutive notes
-    in the input sequence and a subsequence is considered repetitive if it repeats at least min_repetitions times
-    consecutively. Subsequences that do not meet the minimum repetitions requirement are discarded.
-
-    Args:
-        sequence (NoteSequence): The input NoteSequence from which repetitive subsequences are to be extracted.
-        min_repetitions (int, optional): The minimum number of repetitions required for a subsequence to be considered
-            repetitive. Defaults to 2.
-
-    Returns:
-        List[NoteSequence]: A list of NoteSequence objects representing the extracted repetitive subsequences.
-     """
+def _repetitive_subsequences_intervals(sequence: NoteSequence, min_repetitions: int) -> List[Tuple[float, float]]:
     if not sequence.notes:
         return []
 
     subsequences_intervals: List[Tuple[float, float]] = []
-    notes_by_start_time: List[NoteSequence.Note] = sorted(sequence.notes, key=lambda n: n.start_time)
+    notes_by_start_time: List[NoteSequence.Note] = sorted(sequence.notes, key=operator.attrgetter('start_time'))
     previous_note: NoteSequence.Note = notes_by_start_time[0]
     del notes_by_start_time[0]
     repetitions: int = 1
@@ -389,157 +601,41 @@ def extract_repetitive_subsequences(sequence: NoteSequence, min_repetitions: int
             subsequence_end_time = note.end_time
         previous_note = note
 
-    return extract_subsequences(sequence, subsequences_intervals) if subsequences_intervals else []
+    return subsequences_intervals
 
 
-def extract_subsequences(sequence: NoteSequence, subsequences_intervals: List[Tuple[float, float]],
-                         preserve_control_numbers: List[int] = None) -> List[NoteSequence]:
-    """ Extracts subsequences from a given NoteSequence based on specified intervals.
-    This function preserves the state of time signatures, key signatures, tempos, and chord changes
-    across the subsequences.
-
-    Args:
-        sequence (NoteSequence): The input NoteSequence from which subsequences are to be extracted.
-        subsequences_intervals (List[Tuple[float, float]]): A list of tuples representing start and end times
-            in seconds defining the intervals from which subsequences will be extracted.
-        preserve_control_numbers (List[int], optional): A list of control numbers to be preserved when extracting
-            control changes (e.g., pedal events). Defaults to None.
-
-    Returns:
-        List[NoteSequence]: A list of NoteSequence objects representing the extracted subsequences.
-
-    Raises:
-        ValueError: If subsequences_intervals is empty or if any interval extends past the end of the sequence.
-    """
-
-    def _check_time_in_interval(time: float, interval: Tuple[float, float]):
-        return utilities.float_less_or_equal(interval[0], time) and utilities.float_less(time, interval[1])
-
-    if not subsequences_intervals:
-        raise ValueError('Must provide at least a start and end time.')
-    if any(utilities.float_great(time, sequence.total_time) for time in [e for t in subsequences_intervals for e in t]):
-        raise ValueError('Cannot extract subsequence past end of sequence.')
-
-    if preserve_control_numbers is None:
-        preserve_control_numbers = constants.DEFAULT_SUBSEQUENCE_PRESERVE_CONTROL_NUMBERS
-
-    # Init subsequences
-    subsequence = NoteSequence()
-    subsequence.CopyFrom(sequence)
-    subsequence.total_time = 0.0
-    del subsequence.notes[:]
-    del subsequence.time_signatures[:]
-    del subsequence.key_signatures[:]
-    del subsequence.tempos[:]
-    del subsequence.text_annotations[:]
-    del subsequence.control_changes[:]
-    del subsequence.pitch_bends[:]
-    subsequences = [copy.deepcopy(subsequence) for _ in range(len(subsequences_intervals))]
-
-    # Sort subsequences intervals by start time
-    subsequences_intervals = sorted(subsequences_intervals, key=lambda x: x[0])
-    first_subsequence_start_time = subsequences_intervals[0][0]
-
-    # Extract notes into subsequences.
-    for note in sorted(sequence.notes, key=lambda e: e.start_time):
-        # Skip note if it starts before the first subsequence start time
-        if utilities.float_less(note.start_time, first_subsequence_start_time):
+def _copy_sequence_without_fields(sequence: NoteSequence, excluded_fields: Collection[str]) -> NoteSequence:
+    # Same as copying the whole sequence and clearing the excluded fields, without copying them in the first place
+    sequence_copy = NoteSequence()
+    for field, value in sequence.ListFields():
+        if field.name in excluded_fields:
             continue
-        for idx, subsequences_interval in enumerate(subsequences_intervals):
-            current_subsequence = subsequences[idx]
-            subsequence_start_time = subsequences_interval[0]
-            subsequence_end_time = subsequences_interval[1]
-            # Add note to sequence only if it is in its interval
-            if _check_time_in_interval(note.start_time, subsequences_interval):
-                current_subsequence.notes.append(note)
-                new_note = current_subsequence.notes[-1]
-                new_note.start_time -= subsequence_start_time
-                # Truncate end time if the note continue after subsequence end time
-                new_note.end_time = min(new_note.end_time, subsequence_end_time) - subsequence_start_time
-                if utilities.float_great(new_note.end_time, current_subsequence.total_time):
-                    current_subsequence.total_time = new_note.end_time
+        if field.label == field.LABEL_REPEATED:
+            getattr(sequence_copy, field.name).extend(value)
+        elif field.message_type is not None:
+            getattr(sequence_copy, field.name).CopyFrom(value)
+        else:
+            setattr(sequence_copy, field.name, value)
+    return sequence_copy
 
-    # Extract time signatures, key signatures, tempos, and chord changes (beats are handled below, other text
-    # annotations and pitch bends are deleted). Additional state events will be added to the beginning of each
-    # subsequence.
-    events_by_type = [
-        sequence.time_signatures, sequence.key_signatures, sequence.tempos,
-        [
-            annotation for annotation in sequence.text_annotations
-            if annotation.annotation_type == NoteSequence.TextAnnotation.CHORD_SYMBOL
-        ]
-    ]
-    new_event_containers = [[s.time_signatures for s in subsequences],
-                            [s.key_signatures for s in subsequences],
-                            [s.tempos for s in subsequences],
-                            [s.text_annotations for s in subsequences]]
-    for events, containers in zip(events_by_type, new_event_containers):
-        previous_events: List = [None] * len(subsequences)
-        for event in sorted(events, key=lambda e: e.time):
-            for idx, subsequences_interval in enumerate(subsequences_intervals):
-                subsequence_start_time = subsequences_interval[0]
-                if utilities.float_less(event.time, subsequence_start_time):
-                    # Save event to previous state. Since events are sorted by time at the end only the most recent
-                    # event will be considered
-                    previous_events[idx] = event
-                elif _check_time_in_interval(event.time, subsequences_interval):
-                    # Only add the event if it's actually inside the subsequence (and not
-                    # on the boundary with the next one).
-                    containers[idx].append(event)
-                    containers[idx][-1].time -= subsequence_start_time
-        # Add state events to the beginning of the subsequences only if the container is empty (e.g. previous state is
-        # still valid)
-        for idx, event in enumerate(previous_events):
-            if event and not containers[idx]:
-                containers[idx].append(event)
-                containers[idx][-1].time = 0.0
 
-    # Copy stateless events to subsequences. Unlike the stateful events above, stateless events do not have an effect
-    # outside the subsequence in which they occur.
-    stateless_events_by_type = [[
-        annotation for annotation in sequence.text_annotations
-        if annotation.annotation_type in NoteSequence.TextAnnotation.BEAT
-    ]]
-    new_stateless_event_containers = [[s.text_annotations for s in subsequences]]
-    for events, containers in zip(stateless_events_by_type, new_stateless_event_containers):
-        for event in sorted(events, key=lambda e: e.time):
-            if utilities.float_less(event.time, first_subsequence_start_time):
-                continue
-            for idx, subsequences_interval in enumerate(subsequences_intervals):
-                subsequence_start_time = subsequences_interval[0]
-                if _check_time_in_interval(event.time, subsequences_interval):
-                    containers[idx].append(event)
-                    containers[idx][-1].time -= subsequence_start_time
+def _melody_template(quantized_sequence: NoteSequence) -> NoteSequence:
+    # Copy of the sequence without the events, which are added to each melody by _extract_melody
+    return _copy_sequence_without_fields(quantized_sequence, ('notes', 'text_annotations', 'pitch_bends',
+                                                              'control_changes', 'instrument_infos'))
 
-    # Extract piano pedal events (other control changes are deleted). Pedal state is maintained per-instrument and
-    # added to the beginning of each subsequence.
-    pedal_events = [cc for cc in sequence.control_changes if cc.control_number in preserve_control_numbers]
-    previous_pedal_events: List[dict] = [{}] * len(subsequences)
-    for pedal_event in sorted(pedal_events, key=lambda e: e.time):
-        for idx, subsequences_interval in enumerate(subsequences_intervals):
-            subsequence_start_time = subsequences_interval[0]
-            if utilities.float_less(pedal_event.time, subsequence_start_time):
-                previous_pedal_events[idx][(pedal_event.instrument, pedal_event.control_number)] = pedal_event
-            elif _check_time_in_interval(pedal_event.time, subsequences_interval):
-                subsequences[idx].control_changes.append(pedal_event)
-                subsequences[idx].control_changes[-1].time -= subsequence_start_time
-
-    # Quantize subsequences if necessary
-    if utilities.is_absolute_quantized_sequence(sequence):
-        steps_per_second = sequence.quantization_info.steps_per_second
-        for idx, subsequence in enumerate(subsequences):
-            subsequences[idx] = processors.quantizer.quantize_note_sequence_absolute(subsequence, steps_per_second)
-    elif utilities.is_relative_quantized_sequence(sequence):
-        steps_per_quarter = sequence.quantization_info.steps_per_quarter
-        for idx, subsequence in enumerate(subsequences):
-            subsequences[idx] = processors.quantizer.quantize_note_sequence(subsequence, steps_per_quarter)
 
-    # Set subsequence info for all subsequences.
-    for subsequence, start_time in [(x, y) for x, (y, _) in zip(subsequences, subsequences_intervals)]:
-        subsequence.subsequence_info.start_time_offset = start_time
-        subsequence.subsequence_info.end_time_offset = (sequence.total_time - start_time - subsequence.total_time)
+def _time_in_interval(time: float, start_time: float, end_time: float) -> bool:
+    # Same check as utilities.float_less_or_equal(start_time, time) and utilities.float_less(time, end_time), with the
+    # tolerance inlined and the plain comparisons done first, so that most times are checked without calling isclose
+    return ((start_time < time or math.isclose(start_time, time, rel_tol=constants.FLOAT_RELATIVE_TOLERANCE,
+                                               abs_tol=constants.FLOAT_ABSOLUTE_TOLERANCE)) and
+            time < end_time and not math.isclose(time, end_time, rel_tol=constants.FLOAT_RELATIVE_TOLERANCE,
+                                                 abs_tol=constants.FLOAT_ABSOLUTE_TOLERANCE))
 
-    # Filter empty subsequences
-    subsequences = [subsequence for subsequence in subsequences if subsequence.notes]
 
-    return subsequences
+def _float_equal_array(a: np.ndarray, b: float) -> np.ndarray:
+    # Element-wise utilities.float_equal (same formula as math.isclose)
+    tolerance = np.maximum(constants.FLOAT_RELATIVE_TOLERANCE * np.maximum(np.abs(a), abs(b)),
+                           constants.FLOAT_ABSOLUTE_TOLERANCE)
+    return np.abs(a - b) <= tolerance
@@ -1,12 +1,19 @@
 """ This processor module contains functions used to quantized a NoteSequence proto. """
-import copy
 import itertools
+import operator
+from typing import List
+
+import numpy as np
 
 from .. import constants, exceptions, utilities
 from ...protobuf import NoteSequence
 
+# Offset added to the un-quantized steps with the default cutoff (see the comments above QUANTIZE_CUTOFF in constants
+# module)
+_QUANTIZE_OFFSET = 1 - constants.QUANTIZE_CUTOFF
+
 
-def quantize_note_sequence(note_sequence: NoteSequence, steps_per_quarter: int) -> NoteSequence:
+def quantize_note_sequence(note_sequence: NoteSequence, steps_per_quarter: int, in_place: bool = False) -> NoteSequence:
     """ Quantize a NoteSequence proto relative to tempo.
 
     The input NoteSequence is copied and quantization-related fields are populated. Sets the steps_per_quarter field
@@ -19,9 +26,11 @@ def quantize_note_sequence(note_sequence: NoteSequence, steps_per_quarter: int)
     Args:
         note_sequence (NoteSequence): A NoteSequence proto.
         steps_per_quarter (int): Each quarter note of music will be divided into this many quantized time steps.
+        in_place (bool): If True, the input note_sequence is edited directly instead of being copied.
 
     Returns:
-        qns (NoteSequence): A copy of the original NoteSequence, with quantized times added.
+        qns (NoteSequence): A copy of the original NoteSequence (or note_sequence itself if in_place is True), with
+            quantized times added.
 
     Raises:
         MultipleTimeSignatureError: If there is a change in time signature in note_sequence.
@@ -34,12 +43,12 @@ def quantize_note_sequence(note_sequence: NoteSequence, steps_per_quarter: int)
     def _is_power_of_2(x):
         return x and not x & (x - 1)
 
-    qns = copy.deepcopy(note_sequence)
+    qns = note_sequence if in_place else _copy_note_sequence(note_sequence)
 
     qns.quantization_info.steps_per_quarter = steps_per_quarter
 
     if qns.time_signatures:
-        time_signatures = sorted(qns.time_signatures, key=lambda ts: ts.time)
+        time_signatures = sorted(qns.time_signatures, key=operator.attrgetter('time'))
         # There is an implicit 4/4 time signature at 0 time. So if the first time signature is something other than
         # 4/4, and it's at a time other than 0, that's an implicit time signature change.
         if time_signatures[0].time != 0 and not (time_signatures[0].numerator == 4 and
@@ -79,7 +88,7 @@ def quantize_note_sequence(note_sequence: NoteSequence, steps_per_quarter: int)
                                                (qns.time_signatures[0].numerator, qns.time_signatures[0].denominator))
 
     if qns.tempos:
-        tempos = sorted(qns.tempos, key=lambda t: t.time)
+        tempos = sorted(qns.tempos, key=operator.attrgetter('time'))
         # There is an implicit 120.0 qpm tempo at 0 time. So if the first tempo is
         # something other that 120.0, and it's at a time other than 0, that's an
         # implicit tempo change.
@@ -111,7 +120,7 @@ def quantize_note_sequence(note_sequence: NoteSequence, steps_per_quarter: int)
     return qns
 
 
-def quantize_note_sequence_absolute(note_sequence: NoteSequence, steps_per_second: float):
+def quantize_note_sequence_absolute(note_sequence: NoteSequence, steps_per_second: float, in_place: bool = False):
     """ Quantize a NoteSequence proto using absolute event times.
 
     The input NoteSequence is copied and quantization-related fields are populated. Sets the steps_per_second field in
@@ -124,14 +133,16 @@ def quantize_note_sequence_absolute(note_sequence: NoteSequence, steps_per_secon
     Args:
         note_sequence (NoteSequence): A NoteSequence proto.
         steps_per_second (float): Each second will be divided into this many quantized time steps.
+        in_place (bool): If True, the input note_sequence is edited directly instead of being copied.
 
     Returns:
-        qns (NoteSequence): A copy of the original NoteSequence, with quantized times added.
+        qns (NoteSequence): A copy of the original NoteSequence (or note_sequence itself if in_place is True), with
+            quantized times added.
 
     Raises:
         NegativeTimeError: If a note or chord occurs at a negative time.
     """
-    qns = copy.deepcopy(note_sequence)
+    qns = note_sequence if in_place else _copy_note_sequence(note_sequence)
     qns.quantization_info.steps_per_second = steps_per_second
 
     qns.total_quantized_steps = quantize_to_step(qns.total_time, steps_per_second)
@@ -171,29 +182,62 @@ def _quantize_notes(note_sequence: NoteSequence, steps_per_second: int):
     Raises:
         NegativeTimeError: If a note or chord occurs at a negative time.
     """
-    for note in note_sequence.notes:
-        # Quantize the start and end times of the note.
-        note.quantized_start_step = quantize_to_step(note.start_time, steps_per_second)
-        note.quantized_end_step = quantize_to_step(note.end_time, steps_per_second)
-        if note.quantized_end_step == note.quantized_start_step:
-            note.quantized_end_step += 1
-
-        # Do not allow notes to start or end in negative time.
-        if note.quantized_start_step < 0 or note.quantized_end_step < 0:
+    notes = note_sequence.notes
+    if notes:
+        # Quantize the start and end times of all the notes at once (rows of a single array). Both times of a note are
+        # read together, so the notes are only visited once.
+        notes_times = utilities.get_notes_fields_array(notes, ['start_time', 'end_time'])
+        steps = _quantize_to_steps(notes_times, steps_per_second)
+        start_steps, end_steps = steps
+        end_steps += end_steps == start_steps
+
+        # Do not allow notes to start or end in negative time. A single reduction over both rows checks all the steps,
+        # and the first offending note is only looked up if there is one.
+        if steps.min() < 0:
+            note_idx = np.argmax((steps < 0).any(axis=0))
             raise exceptions.NegativeTimeError('Got negative note time: start_step = %s, end_step = %s' %
-                                               (note.quantized_start_step, note.quantized_end_step))
-
-        note.start_time = note.quantized_start_step / steps_per_second
-        note.end_time = note.quantized_end_step / steps_per_second
+                                               (start_steps[note_idx], end_steps[note_idx]))
+
+        # The times are divided by steps_per_second and not multiplied by its reciprocal, which could round them
+        # differently
+        start_times, end_times = (steps / steps_per_second).tolist()
+        for note, start_step, end_step, start_time, end_time in zip(notes, start_steps.tolist(), end_steps.tolist(),
+                                                                     start_times, end_times):
+            note.quantized_start_step = start_step
+            note.quantized_end_step = end_step
+            note.start_time = start_time
+            note.end_time = end_time
 
         # Extend quantized sequence if necessary.
-        if note.quantized_end_step > note_sequence.total_quantized_steps:
-            note_sequence.total_quantized_steps = note.quantized_end_step
+        max_end_step = int(end_steps.max())
+        if max_end_step > note_sequence.total_quantized_steps:
+            note_sequence.total_quantized_steps = max_end_step
 
     # Also quantize control changes and text annotations.
-    for event in itertools.chain(note_sequence.control_changes, note_sequence.text_annotations):
-        # Quantize the event time, disallowing negative time.
-        event.quantized_step = quantize_to_step(event.time, steps_per_second)
-        event.time = event.quantized_step / steps_per_second
-        if event.quantized_step < 0:
-            raise exceptions.NegativeTimeError('Got negative event time: step = %s' % event.quantized_step)
+    events = list(itertools.chain(note_sequence.control_changes, note_sequence.text_annotations))
+    if events:
+        # Quantize the event times, disallowing negative time.
+        steps = _quantize_to_steps(_field_array(events, 'time', len(events)), steps_per_second)
+        for event, step, time in zip(events, steps.tolist(), (steps / steps_per_second).tolist()):
+            event.quantized_step = step
+            event.time = time
+            if step < 0:
+                raise exceptions.NegativeTimeError('Got negative event time: step = %s' % step)
+
+
+def _copy_note_sequence(note_sequence: NoteSequence) -> NoteSequence:
+    note_sequence_copy = NoteSequence()
+    note_sequence_copy.CopyFrom(note_sequence)
+    return note_sequence_copy
+
+
+def _quantize_to_steps(un_quantized_seconds: np.ndarray, steps_per_second: float) -> np.ndarray:
+    # Element-wise quantize_to_step with the default cutoff (the cast to int64 truncates towards zero like int). The
+    # offset is added in place to the scaled times, so only one temporary array is allocated.
+    un_quantized_steps = un_quantized_seconds * steps_per_second
+    un_quantized_steps += _QUANTIZE_OFFSET
+    return un_quantized_steps.astype(np.int64)
+
+
+def _field_array(messages: List, field_name: str, count: int) -> np.ndarray:
+    return np.fromiter(map(operator.attrgetter(field_name), messages), dtype=np.float64, count=count)
@@ -1,4 +1,5 @@
 """ This processor module contains functions used to slice a NoteSequence proto in subsequences. """
+import itertools
 from typing import List, Tuple
 
 from .. import processors, utilities
@@ -36,11 +37,18 @@ def slice_note_sequence(note_sequence: NoteSequence,
     """
     # Compute slices intervals
     total_time = note_sequence.total_time
+    # The start time of each slice is computed from its index, so that the rounding errors of the hop size do not add up
+    # across the slices
+    slice_idx = 0
     current_time = start_time
     slices_times = []
-    notes_by_start_time = sorted(list(note_sequence.notes), key=lambda note: note.start_time)
-    note_idx = 0
-    notes_crossing_split = []
+    if skip_splits_inside_notes:
+        # A note is sustained across a slice start iff the latest end time of the notes started before it is after it.
+        # The notes started before a slice start are found with a binary search on the sorted start times, and the
+        # running maximum of their end times gives the latest one.
+        notes_by_start_time = utilities.get_notes_sorted_by_start_time(note_sequence)
+        notes_start_times = [note.start_time for note in notes_by_start_time]
+        notes_max_end_times = list(itertools.accumulate((note.end_time for note in notes_by_start_time), max))
     while utilities.float_less_or_equal(current_time, total_time):
         slice_start = current_time
         slice_end = current_time + slice_size_seconds
@@ -52,15 +60,12 @@ def slice_note_sequence(note_sequence: NoteSequence,
             else:
                 break
 
-        while (note_idx < len(notes_by_start_time) and
-               utilities.float_less(notes_by_start_time[note_idx].start_time, slice_start)):
-            notes_crossing_split.append(notes_by_start_time[note_idx])
-            note_idx += 1
-
-        if not (skip_splits_inside_notes and notes_crossing_split):
+        started_notes = utilities.bisect_float_left(notes_start_times, slice_start) if skip_splits_inside_notes else 0
+        if not (started_notes and utilities.float_great(notes_max_end_times[started_notes - 1], slice_start)):
             slices_times.append((slice_start, slice_end))
 
-        current_time += hop_size_seconds
+        slice_idx += 1
+        current_time = start_time + slice_idx * hop_size_seconds
 
     return processors.extractor.extract_subsequences(note_sequence, slices_times)
 
@@ -97,12 +102,13 @@ def slice_note_sequence_in_bars(note_sequence: NoteSequence,
     Raises:
         QuantizationStatusError: If note_sequence is not quantized relative to tempo.
     """
-    utilities.assert_is_relative_quantized_sequence(note_sequence)
-    slice_size_seconds = utilities.bars_length_in_quantized_sequence(note_sequence, slice_size_bars)
-    hop_size_seconds = utilities.bars_length_in_quantized_sequence(note_sequence, hop_size_bars)
+    # The time signature, tempo and quantization info are read once for the slice and hop sizes
+    steps_per_bar, _, steps_per_second, _ = utilities.quantization_geometry(note_sequence)
+    total_bars_steps = steps_per_bar * slice_size_bars
+    slice_size_seconds = total_bars_steps / steps_per_second
+    hop_size_seconds = steps_per_bar * hop_size_bars / steps_per_second
     sliced_sequences = slice_note_sequence(note_sequence, slice_size_seconds, hop_size_seconds, start_time,
                                            skip_splits_inside_notes, allow_cropped_slices)
-    total_bars_steps = utilities.steps_per_bar_in_quantized_sequence(note_sequence) * slice_size_bars
     sliced_without_short = [sliced_sequence for sliced_sequence in sliced_sequences
                             if sliced_sequence.total_quantized_steps == total_bars_steps]
     shorter_seqs_count = len(sliced_sequences) - len(sliced_without_short)
@@ -1,5 +1,9 @@
 """ This processor module contains functions used to split a NoteSequence proto in subsequences. """
-from typing import List, Union
+import itertools
+import operator
+from typing import List, Tuple, Union
+
+import numpy as np
 
 from .. import constants, processors, utilities
 from ...protobuf import NoteSequence
@@ -29,38 +33,32 @@ def split_note_sequence(note_sequence: NoteSequence, hop_size_seconds: Union[flo
         List[NoteSequence]: A list of NoteSequence objects representing the split subsequences.
     """
 
-    def _get_masked_array(array, mask):
-        return [e for e, m in zip(array, mask) if m]
-
     # Create split intervals
+    total_time = note_sequence.total_time
     if not isinstance(hop_size_seconds, list):
         split_intervals = []
         current_time = 0
-        while utilities.float_less(current_time, note_sequence.total_time):
-            end_time = min(current_time + hop_size_seconds, note_sequence.total_time)
+        while utilities.float_less(current_time, total_time):
+            end_time = min(current_time + hop_size_seconds, total_time)
             split_intervals.append((current_time, end_time))
             current_time += hop_size_seconds
     else:
         split_intervals = []
         current_time = 0
+        # Repeated (or nearly equal) split points and the ones past the end of the sequence would only add empty
+        # intervals to extract, so the split points that are not after the previous one are skipped
         for split_point in sorted(hop_size_seconds):
-            end_time = min(split_point, note_sequence.total_time)
-            split_intervals.append((current_time, end_time))
-            current_time = end_time
-        split_intervals.append((current_time, note_sequence.total_time))
+            end_time = min(split_point, total_time)
+            if utilities.float_great(end_time, current_time):
+                split_intervals.append((current_time, end_time))
+                current_time = end_time
+        split_intervals.append((current_time, total_time))
 
     # Compute valid intervals according to skip_splits_inside_notes flag
     valid_split_intervals = split_intervals
-    if skip_splits_inside_notes:
-        valid_split_intervals_mask: List[bool] = [True] * len(split_intervals)
-        for note in sorted(list(note_sequence.notes), key=lambda n: n.start_time):
-            for idx, split_interval in enumerate(split_intervals):
-                interval_start = split_interval[0]
-                interval_end = split_interval[1]
-                if (utilities.float_great(note.start_time, interval_start) and
-                        utilities.float_great(note.end_time, interval_end)):
-                    valid_split_intervals_mask[idx] = False
-        valid_split_intervals = _get_masked_array(split_intervals, valid_split_intervals_mask)
+    if skip_splits_inside_notes and split_intervals:
+        valid_split_intervals = _merge_split_intervals_inside_notes(
+            utilities.get_notes_sorted_by_start_time(note_sequence), split_intervals)
 
     if len(valid_split_intervals) > 1:
         return processors.extractor.extract_subsequences(note_sequence, valid_split_intervals)
@@ -109,17 +107,21 @@ def split_note_sequence_on_time_changes(note_sequence: NoteSequence, skip_splits
     Returns:
         List[NoteSequence]: A list of NoteSequence objects representing the split subsequences.
     """
-    # Get time signature and tempo changes events
-    time_signatures_and_tempos = sorted(list(note_sequence.time_signatures) + list(note_sequence.tempos),
-                                        key=lambda t: t.time)
-    time_signatures_and_tempos = [t for t in time_signatures_and_tempos if t.time < note_sequence.total_time]
+    # Get time signature and tempo changes events. The events after the end of the sequence are filtered before the
+    # sort. When the time signatures and the tempos are each already in time order, the sort just merges the two runs.
+    total_time = note_sequence.total_time
+    time_signatures_and_tempos = sorted((t for t in itertools.chain(note_sequence.time_signatures, note_sequence.tempos)
+                                         if t.time < total_time), key=operator.attrgetter('time'))
 
     current_numerator = 4
     current_denominator = 4
     current_qpm = constants.DEFAULT_QUARTERS_PER_MINUTE
-    notes_by_start_time = sorted(list(note_sequence.notes), key=lambda note: note.start_time)
-    note_idx = 0
-    notes_crossing_split = []
+    if skip_splits_inside_notes:
+        # Notes crossing a potential split are the ones started before it that end after it, so there is any iff the
+        # latest end time of the notes started before the split is after it. The notes are only needed to skip splits.
+        notes_by_start_time = utilities.get_notes_sorted_by_start_time(note_sequence)
+        notes_start_times = [note.start_time for note in notes_by_start_time]
+        notes_max_end_times = list(itertools.accumulate((note.end_time for note in notes_by_start_time), max))
     valid_split_times = []
     previous_split_time = (0.0, 0.0)
     for event in time_signatures_and_tempos:
@@ -132,16 +134,12 @@ def split_note_sequence_on_time_changes(note_sequence: NoteSequence, skip_splits
                 # Tempo didn't actually change.
                 continue
 
-        # Update notes crossing potential split.
-        while (note_idx < len(notes_by_start_time) and
-               utilities.float_less(notes_by_start_time[note_idx].start_time, event.time)):
-            notes_crossing_split.append(notes_by_start_time[note_idx])
-            note_idx += 1
-        notes_crossing_split = [note for note in notes_crossing_split if note.end_time > event.time]
-
         previous_end_time = previous_split_time[1]
         if utilities.float_great(event.time, previous_end_time):
-            if not (skip_splits_inside_notes and notes_crossing_split):
+            started_notes = 0
+            if skip_splits_inside_notes:
+                started_notes = utilities.bisect_float_left(notes_start_times, event.time)
+            if not (started_notes and notes_max_end_times[started_notes - 1] > event.time):
                 split_time = (previous_end_time, event.time)
                 valid_split_times.append(split_time)
                 previous_split_time = split_time
@@ -155,8 +153,8 @@ def split_note_sequence_on_time_changes(note_sequence: NoteSequence, skip_splits
 
     # Handle the final subsequence.
     last_event_end_time = previous_split_time[1]
-    if utilities.float_great(note_sequence.total_time, last_event_end_time):
-        valid_split_times.append((last_event_end_time, note_sequence.total_time))
+    if utilities.float_great(total_time, last_event_end_time):
+        valid_split_times.append((last_event_end_time, total_time))
 
     if len(valid_split_times) > 1:
         return processors.extractor.extract_subsequences(note_sequence, valid_split_times)
@@ -177,22 +175,53 @@ def split_note_sequence_on_silence(note_sequence: NoteSequence, gap_seconds: flo
     Returns:
         List[NoteSequence]: A list of NoteSequence objects representing the split subsequences.
     """
-    split_times = []
-    previous_split_time = (0.0, 0.0)
-    last_active_time = 0.0
-
-    for note in sorted(list(note_sequence.notes), key=lambda e: e.start_time):
-        if utilities.float_great(note.start_time, last_active_time + gap_seconds):
-            split_time = (previous_split_time[1], note.start_time)
-            split_times.append(split_time)
-            previous_split_time = split_time
-        last_active_time = max(last_active_time, note.end_time)
+    # A gap longer than gap_seconds cannot fit in a sequence that is not longer than that, so there is nothing to split
+    if note_sequence.total_time <= gap_seconds:
+        return [note_sequence]
 
-    last_end_time = previous_split_time[1]
+    # The sequence is split at the start of each note that starts more than gap_seconds after the last active time
+    # before it, which is the latest end time of the previous notes (or 0 for the first one). The last active times are
+    # the running maximum of the note end times, so all the gaps are found with a few numpy passes over the notes.
+    split_points = []
+    notes_by_start_time = utilities.get_notes_sorted_by_start_time(note_sequence)
+    if notes_by_start_time:
+        notes_start_times, notes_end_times = utilities.get_notes_fields_array(notes_by_start_time,
+                                                                              ['start_time', 'end_time'])
+        last_active_times = np.empty(len(notes_by_start_time), dtype=np.float64)
+        last_active_times[0] = 0.0
+        np.maximum.accumulate(np.maximum(notes_end_times[:-1], 0.0), out=last_active_times[1:])
+        gap_end_times = last_active_times + gap_seconds
+        # Same as utilities.float_great, but the tolerance is only checked for the notes starting after the gap end
+        gap_notes = notes_start_times > gap_end_times
+        split_points = [start_time for start_time, gap_end_time in zip(notes_start_times[gap_notes].tolist(),
+                                                                        gap_end_times[gap_notes].tolist())
+                        if not utilities.float_equal(start_time, gap_end_time)]
+    split_times = list(zip([0.0] + split_points, split_points))
+
+    last_end_time = split_points[-1] if split_points else 0.0
     if utilities.float_great(note_sequence.total_time, last_end_time):
         split_times.append((last_end_time, note_sequence.total_time))
 
     if len(split_times) > 1:
-        processors.extractor.extract_subsequences(note_sequence, split_times)
+        return processors.extractor.extract_subsequences(note_sequence, split_times)
     else:
         return [note_sequence]
+
+
+def _merge_split_intervals_inside_notes(notes_by_start_time: List[NoteSequence.Note],
+                                        split_intervals: List[Tuple[float, float]]) -> List[Tuple[float, float]]:
+    # Merge the consecutive split intervals whose split time (the end of the first one) occurs within a sustained note.
+    # A note is sustained across a split time iff the latest end time of the notes started before it is after it. The
+    # notes started before a split time are found with a binary search on the sorted start times, and the running
+    # maximum of their end times gives the latest one.
+    notes_start_times = [note.start_time for note in notes_by_start_time]
+    notes_max_end_times = list(itertools.accumulate((note.end_time for note in notes_by_start_time), max))
+    merged_split_intervals = []
+    interval_start = split_intervals[0][0]
+    for _, split_time in split_intervals[:-1]:
+        started_notes = utilities.bisect_float_left(notes_start_times, split_time)
+        if not (started_notes and utilities.float_great(notes_max_end_times[started_notes - 1], split_time)):
+            merged_split_intervals.append((interval_start, split_time))
+            interval_start = split_time
+    merged_split_intervals.append((interval_start, split_intervals[-1][1]))
+    return merged_split_intervals
@@ -42,13 +42,13 @@ def stretch_note_sequence(note_sequence: NoteSequence, stretch_factor: float, in
     # Stretch all other event times.
     events = itertools.chain(
         stretched_sequence.time_signatures, stretched_sequence.key_signatures,
-        stretched_sequence.tempos, stretched_sequence.pitch_bends,
-        stretched_sequence.control_changes, stretched_sequence.text_annotations)
+        stretched_sequence.pitch_bends, stretched_sequence.control_changes, stretched_sequence.text_annotations)
     for event in events:
         event.time *= stretch_factor
 
-    # Stretch tempos.
+    # Stretch tempos (both their times and their values are stretched in the same pass).
     for tempo in stretched_sequence.tempos:
+        tempo.time *= stretch_factor
         tempo.qpm /= stretch_factor
 
     return stretched_sequence
@@ -1,8 +1,6 @@
 """ This processor module contains functions used to sustain a NoteSequence proto. """
 import collections
-import copy
 import logging
-import operator
 
 from .. import exceptions, utilities
 from ...protobuf import NoteSequence
@@ -39,57 +37,76 @@ def apply_sustain_control_changes(note_sequence: NoteSequence, sustain_control_n
     if utilities.is_quantized_sequence(note_sequence):
         raise exceptions.QuantizationStatusError('Can only apply sustain control changes to un-quantized NoteSequence.')
 
-    sequence = copy.deepcopy(note_sequence)
+    sequence = NoteSequence()
+    sequence.CopyFrom(note_sequence)
 
-    # Sort all note on/off and sustain on/off events.
+    # Sort all note on/off and sustain on/off events. Each event carries the index of its note or control change, so
+    # that the events with the same time and type keep their order and the protos themselves are never compared.
     events = []
-    events.extend([(note.start_time, _NOTE_ON, note) for note in sequence.notes if not note.is_drum])
-    events.extend([(note.end_time, _NOTE_OFF, note) for note in sequence.notes if not note.is_drum])
-
-    for cc in sequence.control_changes:
+    events_append = events.append
+    for cc_idx, cc in enumerate(sequence.control_changes):
         if cc.control_number != sustain_control_number:
             continue
         value = cc.control_value
         if value < 0 or value > 127:
             logging.warning('Sustain control change has out of range value: %d', value)
         if value >= 64:
-            events.append((cc.time, _SUSTAIN_ON, cc))
+            events_append((cc.time, _SUSTAIN_ON, cc_idx, cc))
         elif value < 64:
-            events.append((cc.time, _SUSTAIN_OFF, cc))
+            events_append((cc.time, _SUSTAIN_OFF, cc_idx, cc))
+
+    # Without sustain events the notes are left as they are, unless a note ends before it starts (its note off event
+    # would be processed first and the note would be extended to the last event)
+    if not events and not any(note.end_time < note.start_time for note in sequence.notes if not note.is_drum):
+        return sequence
+
+    # Both events of a note are added in a single pass over the notes
+    for note_idx, note in enumerate(sequence.notes):
+        if note.is_drum:
+            continue
+        events_append((note.start_time, _NOTE_ON, note_idx, note))
+        events_append((note.end_time, _NOTE_OFF, note_idx, note))
+
+    # Sort, using the time and event type constants to ensure the order events are processed. The tuples are compared
+    # directly, without building a key tuple for each event.
+    events.sort()
 
-    # Sort, using the time and event type constants to ensure the order events are processed.
-    events.sort(key=operator.itemgetter(0, 1))
+    # Active notes keyed by instrument. The notes of an instrument are stored by identity in insertion order, so that a
+    # note is found and removed in constant time without comparing the protos field by field.
+    active_notes = collections.defaultdict(dict)
+    # Whether sustain is active for a given instrument. Sustain is off for the instruments not in the dict.
+    sus_active = {}
+    # Notes left with no duration, removed from the sequence in one pass once all the events are processed.
+    zero_duration_ids = set()
 
-    # Lists of active notes, keyed by instrument.
-    active_notes = collections.defaultdict(list)
-    # Whether sustain is active for a given instrument.
-    sus_active = collections.defaultdict(lambda: False)
+    # The total time is updated locally and written to the sequence once at the end.
+    total_time = sequence.total_time
 
     # Iterate through all sustain on/off and note on/off events in order.
     time = 0
-    for time, event_type, event in events:
+    for time, event_type, _, event in events:
         if event_type == _SUSTAIN_ON:
             sus_active[event.instrument] = True
         elif event_type == _SUSTAIN_OFF:
             sus_active[event.instrument] = False
             # End all notes for the instrument that were being extended.
-            new_active_notes = []
-            for note in active_notes[event.instrument]:
+            new_active_notes = {}
+            for note_id, note in active_notes[event.instrument].items():
                 if note.end_time < time:
                     # This note was being extended because of sustain.
                     # Update the end time and don't keep it in the list.
                     note.end_time = time
-                    if time > sequence.total_time:
-                        sequence.total_time = time
+                    if time > total_time:
+                        total_time = time
                 else:
                     # This note is actually still active, keep it.
-                    new_active_notes.append(note)
+                    new_active_notes[note_id] = note
             active_notes[event.instrument] = new_active_notes
         elif event_type == _NOTE_ON:
-            if sus_active[event.instrument]:
+            if sus_active.get(event.instrument, False):
                 # If sustain is on, end all previous notes with the same pitch.
-                new_active_notes = []
-                for note in active_notes[event.instrument]:
+                new_active_notes = {}
+                for note_id, note in active_notes[event.instrument].items():
                     if note.pitch == event.pitch:
                         note.end_time = time
                         if note.start_time == note.end_time:
@@ -100,29 +117,35 @@ def apply_sustain_control_changes(note_sequence: NoteSequence, sustain_control_n
                             # preserve both notes and make the same duration, but that is a
                             # little more complicated to implement. Will keep this solution
                             # until we find that we need the more complex one.
-                            sequence.notes.remove(note)
+                            zero_duration_ids.add(note_id)
                     else:
-                        new_active_notes.append(note)
+                        new_active_notes[note_id] = note
                 active_notes[event.instrument] = new_active_notes
             # Add this new note to the list of active notes.
-            active_notes[event.instrument].append(event)
+            active_notes[event.instrument][id(event)] = event
         elif event_type == _NOTE_OFF:
-            if sus_active[event.instrument]:
+            if sus_active.get(event.instrument, False):
                 # Note continues until another note of the same pitch or sustain ends.
                 pass
             else:
                 # Remove this particular note from the active list.
                 # It may have already been removed if a note of the same pitch was
                 # played when sustain was active.
-                if event in active_notes[event.instrument]:
-                    active_notes[event.instrument].remove(event)
+                active_notes[event.instrument].pop(id(event), None)
         else:
             raise AssertionError('Invalid event_type: %s' % event_type)
 
     # End any notes that were still active due to sustain.
     for instrument in active_notes.values():
-        for note in instrument:
+        for note in instrument.values():
             note.end_time = time
-            sequence.total_time = time
+            total_time = time
+    sequence.total_time = total_time
+
+    # The notes are rebuilt only at the end, since clearing them detaches the notes referenced by the events
+    if zero_duration_ids:
+        kept_notes = [note for note in sequence.notes if id(note) not in zero_duration_ids]
+        del sequence.notes[:]
+        sequence.notes.extend(kept_notes)
 
     return sequence
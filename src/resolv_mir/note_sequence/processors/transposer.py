@@ -1,7 +1,9 @@
 """ This processor module contains functions used to transpose a NoteSequence proto. """
 from typing import Tuple
 
-from .. import constants
+import numpy as np
+
+from .. import constants, utilities
 from ..chord_symbols import transposer as chord_transposer
 from ...protobuf import NoteSequence
 
@@ -35,15 +37,6 @@ def transpose_note_sequence(note_sequence: NoteSequence,
     Raises:
       ChordSymbolError: If a chord symbol is unable to be transposed.
     """
-    def transpose_note_pitch(n: NoteSequence.Note):
-        new_pitch = n.pitch + amount
-        if not delete_notes:
-            while new_pitch > max_allowed_pitch:
-                new_pitch -= constants.NOTES_PER_OCTAVE
-            while new_pitch < min_allowed_pitch:
-                new_pitch += constants.NOTES_PER_OCTAVE
-        return new_pitch
-
     if min_allowed_pitch > max_allowed_pitch:
         raise ValueError('min_allowed_pitch should be <= max_allowed_pitch')
 
@@ -52,47 +45,59 @@ def transpose_note_sequence(note_sequence: NoteSequence,
         new_ns.CopyFrom(note_sequence)
         note_sequence = new_ns
 
-    new_note_list = []
-    deleted_note_count = 0
-    end_time = 0
-    for note in note_sequence.notes:
-        if note.is_drum:
-            end_time = max(end_time, note.end_time)
-            new_note_list.append(note)
-        else:
-            transposed_pitch = transpose_note_pitch(note)
-            if min_allowed_pitch <= transposed_pitch <= max_allowed_pitch:
-                end_time = max(end_time, note.end_time)
-                note.pitch = transposed_pitch
-                # The pitch name, if present, will no longer be valid.
-                # TODO - populate the correct transposed pitch name (also according to key)
-                note.pitch_name = NoteSequence.UNKNOWN_PITCH_NAME
-                new_note_list.append(note)
-            else:
-                deleted_note_count += 1
-
-    if deleted_note_count > 0:
-        del note_sequence.notes[:]
-        note_sequence.notes.extend(new_note_list)
+    # Read the fields of all the notes at once (rows of a single array) and compute the transposed pitches with numpy.
+    # Only the notes to transpose are accessed again afterwards.
+    notes = list(note_sequence.notes)
+    n_notes = len(notes)
+    pitches, is_drum, end_times = utilities.get_notes_fields_array(notes, ['pitch', 'is_drum', 'end_time'])
+    is_drum = is_drum.astype(bool)
+    transposed_pitches = pitches.astype(np.int64) + amount
+    if not delete_notes:
+        # Move the pitches above the bounds to the highest octave not above the max allowed pitch, then the ones below
+        # the bounds to the lowest octave not below the min allowed pitch
+        transposed_pitches = np.where(transposed_pitches > max_allowed_pitch,
+                                      max_allowed_pitch - (max_allowed_pitch - transposed_pitches) %
+                                      constants.NOTES_PER_OCTAVE, transposed_pitches)
+        transposed_pitches = np.where(transposed_pitches < min_allowed_pitch,
+                                      min_allowed_pitch + (transposed_pitches - min_allowed_pitch) %
+                                      constants.NOTES_PER_OCTAVE, transposed_pitches)
+    in_range = (transposed_pitches >= min_allowed_pitch) & (transposed_pitches <= max_allowed_pitch)
+    # Drum notes are never transposed nor deleted
+    kept = is_drum | in_range
+    deleted_note_count = n_notes - int(np.count_nonzero(kept))
+
+    transposed_pitches = transposed_pitches.tolist()
+    for note_idx in np.flatnonzero(in_range & ~is_drum).tolist():
+        note = notes[note_idx]
+        note.pitch = transposed_pitches[note_idx]
+        # The pitch name, if present, will no longer be valid.
+        # TODO - populate the correct transposed pitch name (also according to key)
+        note.pitch_name = NoteSequence.UNKNOWN_PITCH_NAME
+
+    # The out-of-bounds notes are deleted starting from the last one, so that the indexes of the ones still to delete
+    # don't shift. This is cheaper than rebuilding the notes, which copies every kept note back into the sequence.
+    for note_idx in np.flatnonzero(~kept)[::-1].tolist():
+        del note_sequence.notes[note_idx]
 
     # Since notes were deleted, we may need to update the total time.
-    note_sequence.total_time = end_time
+    note_sequence.total_time = end_times[kept].max(initial=0)
 
     if transpose_chords:
         # Also update the chord symbol text annotations. This can raise a
-        # ChordSymbolError if a chord symbol cannot be interpreted.
-        for ta in note_sequence.text_annotations:
-            if ta.annotation_type == NoteSequence.TextAnnotation.CHORD_SYMBOL and ta.text != constants.NO_CHORD:
-                ta.text = chord_transposer.transpose_chord_symbol(ta.text, amount)
+        # ChordSymbolError if a chord symbol cannot be interpreted. The chord symbols are collected first, so that
+        # only their text is read and written again (the transposition of each figure is memoized).
+        chord_symbols = [ta for ta in note_sequence.text_annotations
+                         if ta.annotation_type == NoteSequence.TextAnnotation.CHORD_SYMBOL]
+        for ta in chord_symbols:
+            text = ta.text
+            if text != constants.NO_CHORD:
+                ta.text = chord_transposer.transpose_chord_symbol(text, amount)
     else:
-        # Remove chord symbol text annotations.
-        text_annotations_to_keep = []
-        for ta in note_sequence.text_annotations:
-            if ta.annotation_type != NoteSequence.TextAnnotation.CHORD_SYMBOL:
-                text_annotations_to_keep.append(ta)
-        if len(text_annotations_to_keep) < len(note_sequence.text_annotations):
-            del note_sequence.text_annotations[:]
-            note_sequence.text_annotations.extend(text_annotations_to_keep)
+        # Remove chord symbol text annotations, starting from the last one like the out-of-bounds notes.
+        chord_symbol_indexes = [idx for idx, ta in enumerate(note_sequence.text_annotations)
+                                if ta.annotation_type == NoteSequence.TextAnnotation.CHORD_SYMBOL]
+        for idx in reversed(chord_symbol_indexes):
+            del note_sequence.text_annotations[idx]
 
     # Also transpose key signatures.
     for ks in note_sequence.key_signatures:
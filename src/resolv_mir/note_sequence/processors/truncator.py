@@ -7,7 +7,7 @@ def truncate_quantized_sequence_at_step(note_sequence: NoteSequence, end_step: i
     """ Truncates a quantized NoteSequence at a specified step.
 
     This function truncates a given quantized NoteSequence at the specified end step. All notes that extend beyond the
-    end step are shortened to end at the specified step.
+    end step are shortened to end at the specified step, while notes that start at or after the end step are removed.
 
     Args:
         note_sequence (NoteSequence): The input quantized NoteSequence to be truncated.
@@ -20,15 +20,19 @@ def truncate_quantized_sequence_at_step(note_sequence: NoteSequence, end_step: i
         QuantizationStatusError: If note_sequence is not quantized relative to tempo.
     """
     utilities.assert_is_relative_quantized_sequence(note_sequence)
-    del_note_index = 0
-    steps_per_second = note_sequence.quantization_info.steps_per_second
+    # The sequence is quantized relative to tempo, so the steps per second are derived from the tempo
+    steps_per_second = utilities.steps_per_second_in_quantized_sequence(note_sequence)
+    removed_note_indexes = []
     for idx, note in enumerate(note_sequence.notes):
-        if note.quantized_end_step > end_step:
-            del_note_index = idx + 1
+        if note.quantized_start_step >= end_step:
+            removed_note_indexes.append(idx)
+        elif note.quantized_end_step > end_step:
             note.quantized_end_step = end_step
             note.end_time = end_step / steps_per_second
 
-    del note_sequence.notes[:del_note_index]
+    # The notes are deleted starting from the last one, so that the indexes of the ones still to delete don't shift
+    for idx in reversed(removed_note_indexes):
+        del note_sequence.notes[idx]
     return note_sequence
 
 
@@ -49,5 +53,6 @@ def truncate_quantized_sequence_at_bar(note_sequence: NoteSequence, end_bar: int
         QuantizationStatusError: If note_sequence is not quantized relative to tempo.
     """
     utilities.assert_is_relative_quantized_sequence(note_sequence)
-    end_step = utilities.steps_per_bar_in_quantized_sequence(note_sequence) * end_bar
+    # The steps per bar are a float, while the quantized steps of the notes are integers
+    end_step = int(utilities.steps_per_bar_in_quantized_sequence(note_sequence) * end_bar)
     return truncate_quantized_sequence_at_step(note_sequence, end_step)
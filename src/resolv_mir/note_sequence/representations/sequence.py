@@ -11,11 +11,16 @@ SILENCE_SYMBOL = 129
 
 def pitch_sequence_representation(note_sequence: NoteSequence) -> List[int]:
     utilities.assert_is_quantized_sequence(note_sequence)
-    pitch_sequence = [SILENCE_SYMBOL] * note_sequence.total_quantized_steps
+    # The held steps of a note are set with a single slice assignment. Holds are clipped to the sequence length, so that
+    # the sequence is never extended.
+    total_steps = note_sequence.total_quantized_steps
+    pitch_sequence = [SILENCE_SYMBOL] * total_steps
     for note in note_sequence.notes:
-        pitch_sequence[note.quantized_start_step] = note.pitch
-        for i in range(note.quantized_start_step + 1, note.quantized_end_step):
-            pitch_sequence[i] = HOLD_NOTE_SYMBOL
+        start_step = note.quantized_start_step
+        pitch_sequence[start_step] = note.pitch
+        hold_end_step = min(note.quantized_end_step, total_steps)
+        if hold_end_step > start_step + 1:
+            pitch_sequence[start_step + 1:hold_end_step] = [HOLD_NOTE_SYMBOL] * (hold_end_step - start_step - 1)
     return pitch_sequence
 
 
@@ -47,32 +52,31 @@ def from_pitch_sequence(
     note_sequence.total_quantized_steps = total_quantized_steps
     note_sequence.total_time = total_quantized_steps / steps_per_second
 
-    current_note = None
-    for step, pitch in enumerate(pitch_sequence):
-        if pitch == HOLD_NOTE_SYMBOL:
-            if not current_note:
+    # Run-length encode the pitch sequence: a note starts at a pitch symbol and lasts until the next pitch or silence
+    # symbol (or the end of the sequence), the hold symbols in between extend it.
+    run_start_steps = [step for step, pitch in enumerate(pitch_sequence) if pitch != HOLD_NOTE_SYMBOL]
+    run_start_steps.append(total_quantized_steps)
+    if run_start_steps[0] > 0:
+        logging.warning("The given pitch sequence starts with a HOLD_NOTE symbol."
+                        "Considering it as a silence note.")
+    add_note = note_sequence.notes.add
+    for start_step, end_step in zip(run_start_steps, run_start_steps[1:]):
+        pitch = pitch_sequence[start_step]
+        if pitch == SILENCE_SYMBOL:
+            # Hold symbols following a silence are considered silence as well
+            if end_step > start_step + 1:
                 logging.warning("The given pitch sequence starts with a HOLD_NOTE symbol."
                                 "Considering it as a silence note.")
-                continue
-        else:
-            if current_note:
-                current_note.quantized_end_step = step
-                current_note.end_time = step / steps_per_second
-            if pitch != SILENCE_SYMBOL:
-                note = note_sequence.notes.add()
-                note.instrument = instrument
-                note.program = program
-                note.quantized_start_step = step
-                note.start_time = step / steps_per_second
-                note.pitch = pitch
-                note.velocity = velocity
-                note.is_drum = False
-                current_note = note
-            else:
-                current_note = None
-
-    if current_note:
-        current_note.quantized_end_step = total_quantized_steps
-        current_note.end_time = total_quantized_steps / steps_per_second
+            continue
+        note = add_note()
+        note.instrument = instrument
+        note.program = program
+        note.quantized_start_step = start_step
+        note.start_time = start_step / steps_per_second
+        note.pitch = pitch
+        note.velocity = velocity
+        note.is_drum = False
+        note.quantized_end_step = end_step
+        note.end_time = end_step / steps_per_second
 
     return note_sequence
@@ -18,6 +18,7 @@ import abc
 import bisect
 import copy
 import logging
+import operator
 
 
 class MergeStatisticsError(Exception):
@@ -132,7 +133,7 @@ def log_statistics_list(stats_list, logger_fn=logging.info):
       logger_fn: The function which will be called on the string representation
           of each `Statistic`.
     """
-    for stat in sorted(stats_list, key=lambda s: s.name):
+    for stat in sorted(stats_list, key=operator.attrgetter('name')):
         logger_fn(str(stat))
 
 
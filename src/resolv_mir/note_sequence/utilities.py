@@ -8,8 +8,11 @@ Additionally, it provides functions for comparing NoteSequence protos for equali
 and handling floating-point number comparisons with tolerance.
 
 """
+import bisect
+import itertools
 import math
-from typing import List, Callable, TypeVar
+import operator
+from typing import List, Callable, Hashable, Tuple, TypeVar
 
 import numpy as np
 
@@ -28,8 +31,8 @@ def is_quantized_sequence(note_sequence: NoteSequence) -> bool:
     Returns:
       (bool): True if `note_sequence` is quantized, otherwise False.
     """
-    return (note_sequence.quantization_info.steps_per_quarter > 0
-            or note_sequence.quantization_info.steps_per_second > 0)
+    quantization_info = note_sequence.quantization_info
+    return quantization_info.steps_per_quarter > 0 or quantization_info.steps_per_second > 0
 
 
 def is_relative_quantized_sequence(note_sequence: NoteSequence) -> bool:
@@ -88,9 +91,8 @@ def bars_in_quantized_sequence(note_sequence: NoteSequence) -> int:
     Raises:
         QuantizationStatusError: If note_sequence is not quantized relative to tempo.
     """
-
-    bar_count = note_sequence.total_quantized_steps / steps_per_bar_in_quantized_sequence(note_sequence)
-    return math.ceil(bar_count)
+    _, bar_count, _, _ = quantization_geometry(note_sequence)
+    return bar_count
 
 
 def bars_length_in_quantized_sequence(note_sequence: NoteSequence, n_bars: int) -> float:
@@ -106,9 +108,8 @@ def bars_length_in_quantized_sequence(note_sequence: NoteSequence, n_bars: int)
     Raises:
         QuantizationStatusError: If note_sequence is not quantized relative to tempo.
     """
-    assert_is_relative_quantized_sequence(note_sequence)
-    total_steps = steps_per_bar_in_quantized_sequence(note_sequence) * n_bars
-    steps_per_second = steps_per_second_in_quantized_sequence(note_sequence)
+    steps_per_bar, _, steps_per_second, _ = quantization_geometry(note_sequence)
+    total_steps = steps_per_bar * n_bars
     bars_length = total_steps / steps_per_second
     return bars_length
 
@@ -126,10 +127,11 @@ def quarters_per_bar_in_quantized_sequence(note_sequence: NoteSequence) -> float
         QuantizationStatusError: If note_sequence is not quantized relative to tempo.
     """
     assert_is_relative_quantized_sequence(note_sequence)
-    # A quantized NoteSequence must have only one time signature so total numbers of beats in a bar is given by:
-    beat_per_bar = note_sequence.time_signatures[0].numerator
-    quarters_per_beat = quarters_per_beat_in_quantized_sequence(note_sequence)
-    quarters_per_bar = quarters_per_beat * beat_per_bar
+    # A quantized NoteSequence must have only one time signature so total numbers of beats in a bar is given by its
+    # numerator. The time signature is read once for both the beats per bar and the quarters per beat.
+    time_signature = note_sequence.time_signatures[0]
+    quarters_per_beat = 4.0 / time_signature.denominator
+    quarters_per_bar = quarters_per_beat * time_signature.numerator
     return quarters_per_bar
 
 
@@ -145,9 +147,9 @@ def steps_per_bar_in_quantized_sequence(note_sequence: NoteSequence) -> float:
     Raises:
         QuantizationStatusError: If note_sequence is not quantized relative to tempo.
     """
-    quarters_per_bar = quarters_per_bar_in_quantized_sequence(note_sequence)
-    steps_per_bar = note_sequence.quantization_info.steps_per_quarter * quarters_per_bar
-    return steps_per_bar
+    assert_is_relative_quantized_sequence(note_sequence)
+    # A quantized NoteSequence must have only one time signature
+    return _steps_per_bar(note_sequence.quantization_info.steps_per_quarter, note_sequence.time_signatures[0])
 
 
 def steps_per_second_in_quantized_sequence(note_sequence: NoteSequence) -> float:
@@ -169,6 +171,35 @@ def steps_per_second_in_quantized_sequence(note_sequence: NoteSequence) -> float
     return steps_per_quarter_to_steps_per_second(steps_per_quarter, qpm)
 
 
+def quantization_geometry(note_sequence: NoteSequence) -> Tuple[float, int, float, int]:
+    """ Compute the quantization geometry of a quantized NoteSequence proto.
+
+    The time signature, tempo and quantization info are read once and the steps per bar, number of bars, steps per
+    second and total steps are derived together, instead of calling the single utility functions that each read them
+    again from the proto.
+
+    Args:
+        note_sequence (NoteSequence): A NoteSequence proto that has been quantized relative to tempo.
+
+    Returns:
+        steps_per_bar (float): The number of steps per bar in note_sequence.
+        bar_count (int): Number of bars in note_sequence, rounded to the next integer value.
+        steps_per_second (float): The number of steps per second in note_sequence.
+        total_steps (int): The total number of quantized steps in note_sequence.
+
+    Raises:
+        QuantizationStatusError: If note_sequence is not quantized relative to tempo.
+    """
+    assert_is_relative_quantized_sequence(note_sequence)
+    # A quantized NoteSequence must have only one time signature and only one tempo
+    steps_per_quarter = note_sequence.quantization_info.steps_per_quarter
+    steps_per_bar = _steps_per_bar(steps_per_quarter, note_sequence.time_signatures[0])
+    total_steps = note_sequence.total_quantized_steps
+    bar_count = math.ceil(total_steps / steps_per_bar)
+    steps_per_second = steps_per_quarter_to_steps_per_second(steps_per_quarter, note_sequence.tempos[0].qpm)
+    return steps_per_bar, bar_count, steps_per_second, total_steps
+
+
 def steps_per_quarter_to_steps_per_second(steps_per_quarter: int, qpm: float) -> float:
     """ Convert the number of steps per second to the number of steps per quarter given a QPM.
 
@@ -197,22 +228,59 @@ def steps_per_second_to_step_per_quarter(steps_per_second: int, qpm: float):
     return steps_per_quarter
 
 
-def get_note_pitches_histogram_for_note_sequence(note_sequence: NoteSequence) -> np.ndarray:
+def get_note_pitches_histogram_for_note_sequence(note_sequence: NoteSequence, out: np.ndarray = None) -> np.ndarray:
     """ Gets a histogram of the note occurrences in a NoteSequence proto.
 
     Args:
         note_sequence (NoteSequence): A NoteSequence proto.
+        out (np.ndarray, optional): An array of 12 ints where the histogram is written. It can be reused across calls
+            (e.g. when computing the histograms of a corpus) to avoid allocating a new result each time. If None, a
+            new array is returned. Defaults to None.
 
     Returns:
         histogram (ndarray): A list of 12 ints, one for each note value (C at index 0 through B at
         index 11). Each int is the total number of times that note occurred in
-        the given NoteSequence.
+        the given NoteSequence. If out is given, it is returned.
+    """
+    notes = note_sequence.notes
+    np_notes = np.fromiter(map(operator.attrgetter('pitch'), notes), dtype=np.int32, count=len(notes))
+    # Pitches below the MIDI range are rare, so the filtered copy is only made if there is any
+    if np_notes.size and np_notes.min() < constants.MIN_MIDI_PITCH:
+        np_notes = np_notes[np_notes >= constants.MIN_MIDI_PITCH]
+    histogram = np.bincount(np_notes % constants.NOTES_PER_OCTAVE, minlength=constants.NOTES_PER_OCTAVE)
+    if out is None:
+        return histogram
+    out[:] = histogram
+    return out
+
+
+def get_note_pitches_histograms_for_note_sequences(note_sequences: List[NoteSequence]) -> np.ndarray:
+    """ Gets the histograms of the note occurrences of a batch of NoteSequence protos.
+
+    The pitches of all the sequences are read into a single flat array, together with the index of the sequence each
+    note belongs to, so that all the histograms are counted with a single bincount instead of one
+    get_note_pitches_histogram_for_note_sequence call per sequence.
+
+    Args:
+        note_sequences (List[NoteSequence]): A list of NoteSequence protos.
+
+    Returns:
+        histograms (ndarray): An array of shape (len(note_sequences), 12), whose rows are the histograms of the
+        sequences as returned by get_note_pitches_histogram_for_note_sequence.
     """
-    note_pitches = [note.pitch for note in note_sequence.notes]
-    np_notes = np.array(note_pitches, dtype=int)
-    histogram = np.bincount(np_notes[np_notes >= constants.MIN_MIDI_PITCH] % constants.NOTES_PER_OCTAVE,
-                            minlength=constants.NOTES_PER_OCTAVE)
-    return histogram
+    sequences_notes = [note_sequence.notes for note_sequence in note_sequences]
+    n_sequences = len(sequences_notes)
+    notes_per_sequence = np.fromiter(map(len, sequences_notes), dtype=np.int64, count=n_sequences)
+    pitches = np.fromiter(map(operator.attrgetter('pitch'), itertools.chain.from_iterable(sequences_notes)),
+                          dtype=np.int64, count=notes_per_sequence.sum())
+    sequence_indexes = np.repeat(np.arange(n_sequences), notes_per_sequence)
+    if pitches.size and pitches.min() < constants.MIN_MIDI_PITCH:
+        in_range = pitches >= constants.MIN_MIDI_PITCH
+        pitches, sequence_indexes = pitches[in_range], sequence_indexes[in_range]
+    # Each sequence has its own 12 bins in the flat histogram
+    bins = sequence_indexes * constants.NOTES_PER_OCTAVE + pitches % constants.NOTES_PER_OCTAVE
+    histograms = np.bincount(bins, minlength=n_sequences * constants.NOTES_PER_OCTAVE)
+    return histograms.reshape(n_sequences, constants.NOTES_PER_OCTAVE)
 
 
 def count_onsets(note_sequence: NoteSequence) -> int:
@@ -224,8 +292,16 @@ def count_onsets(note_sequence: NoteSequence) -> int:
     Returns:
         onsets_count (int): The number of onsets in the given NoteSequence.
     """
-    onsets = uniquify_unhashable_obj_list(note_sequence.notes, lambda a, b: float_equal(a.start_time, b.start_time))
-    onsets_count = len(onsets)
+    # Same as uniquifying the notes by start time with float_equal, but each start time is only compared with the
+    # closest onset times found so far (kept sorted), which are the only ones that can be equal to it.
+    onset_times = []
+    for start_time in map(operator.attrgetter('start_time'), note_sequence.notes):
+        idx = bisect.bisect_left(onset_times, start_time)
+        if ((idx < len(onset_times) and float_equal(onset_times[idx], start_time)) or
+                (idx > 0 and float_equal(onset_times[idx - 1], start_time))):
+            continue
+        onset_times.insert(idx, start_time)
+    onsets_count = len(onset_times)
     return onsets_count
 
 
@@ -239,8 +315,10 @@ def get_pitch_list(note_sequence: NoteSequence, unique: bool = False) -> List[in
     Returns:
         pitch_list (List[int]): The list of all pitches in note_sequence.
     """
+    if unique:
+        return list({note.pitch for note in note_sequence.notes})
     pitch_list = [note.pitch for note in note_sequence.notes]
-    return list(set(pitch_list)) if unique else pitch_list
+    return pitch_list
 
 
 def get_velocity_list(note_sequence: NoteSequence, unique: bool = False, normalize: bool = True) -> List[int]:
@@ -248,15 +326,20 @@ def get_velocity_list(note_sequence: NoteSequence, unique: bool = False, normali
 
     Args:
         note_sequence (NoteSequence): A NoteSequence proto.
-        unique (bool): If True, returns a list containing only unique velocities. Default to False.
+        unique (bool): If True, returns a list containing only unique velocities, in ascending order. Default to
+            False.
         normalize (bool): If True, normalize the velocities by constants.MAX_MIDI_VELOCITY. Default to True.
 
     Returns:
         velocity_list (List[int]): The list of all velocities in note_sequence.
     """
     normalization_factor = constants.MAX_MIDI_VELOCITY if normalize else 1
+    if unique:
+        # The velocities are uniquified before normalizing them, so that each distinct velocity is divided only once.
+        # They are sorted so that the order of the list doesn't depend on the set iteration order.
+        return [velocity / normalization_factor for velocity in sorted({note.velocity for note in note_sequence.notes})]
     velocity_list = [note.velocity / normalization_factor for note in note_sequence.notes]
-    return list(set(velocity_list)) if unique else velocity_list
+    return velocity_list
 
 
 def get_unique_notes(note_sequence: NoteSequence) -> List[NoteSequence.Note]:
@@ -269,10 +352,48 @@ def get_unique_notes(note_sequence: NoteSequence) -> List[NoteSequence.Note]:
     Returns:
         unique_notes_list (List[NoteSequence.Note]): The list of all unique notes in note_sequence.
     """
-    unique_notes_list = uniquify_unhashable_obj_list(note_sequence.notes, equal_notes)
+    # Without time checks two notes are equal if they have the same pitch, so the notes are uniquified by pitch
+    unique_notes_list = uniquify_unhashable_obj_list(note_sequence.notes, key_fn=operator.attrgetter('pitch'))
     return unique_notes_list
 
 
+def get_notes_sorted_by_start_time(note_sequence: NoteSequence) -> List[NoteSequence.Note]:
+    """ Returns a list of all notes in the given NoteSequence proto sorted by start time.
+    The sort is stable, so notes with the same start time keep their order in note_sequence.
+
+    Args:
+        note_sequence (NoteSequence): A NoteSequence proto.
+
+    Returns:
+        notes_by_start_time (List[NoteSequence.Note]): The list of all notes in note_sequence sorted by start time.
+    """
+    notes_by_start_time = sorted(note_sequence.notes, key=operator.attrgetter('start_time'))
+    return notes_by_start_time
+
+
+def get_notes_fields_array(notes: List[NoteSequence.Note], field_names: List[str],
+                           dtype: np.dtype = np.float64) -> np.ndarray:
+    """ Returns the values of the given fields of a list of notes as the rows of a single array.
+    All the fields of a note are read together, so the notes are visited only once whatever the number of fields.
+
+    Args:
+        notes (List[NoteSequence.Note]): The notes whose fields are read (e.g. the notes of a NoteSequence proto).
+        field_names (List[str]): The names of the fields to read.
+        dtype (np.dtype): The type of the array. The default float64 holds exactly the values of the integer and
+            boolean fields of a note too, so fields of different types can be read together.
+
+    Returns:
+        fields_array (np.ndarray): An array of shape (len(field_names), len(notes)), whose rows hold the values of
+            the fields in the order of field_names.
+    """
+    n_notes, n_fields = len(notes), len(field_names)
+    fields_values = map(operator.attrgetter(*field_names), notes)
+    if n_fields > 1:
+        fields_values = itertools.chain.from_iterable(fields_values)
+    fields_array = np.fromiter(fields_values, dtype=dtype, count=n_fields * n_notes).reshape(n_notes, n_fields).T
+    return fields_array
+
+
 def get_unique_note_sequences(note_sequences: List[NoteSequence]) -> List[NoteSequence]:
     """ Returns a list of all unique NoteSequence proto in the given NoteSequence proto list.
     Two note sequences are considered equal according to the function equal_note_sequences.
@@ -283,7 +404,18 @@ def get_unique_note_sequences(note_sequences: List[NoteSequence]) -> List[NoteSe
     Returns:
         unique_note_sequences_list (List[NoteSequence]): The list of unique note sequences.
     """
-    unique_note_sequences_list = uniquify_unhashable_obj_list(note_sequences, equal_note_sequences)
+    # Equal note sequences have the same pitches, so each note sequence is only compared with the unique ones with its
+    # pitches. The notes of each note sequence are read once, instead of at every comparison with equal_note_sequences.
+    unique_note_sequences_list = []
+    unique_notes_times_by_pitches = {}
+    for note_sequence in note_sequences:
+        notes = note_sequence.notes
+        pitches = tuple(map(operator.attrgetter('pitch'), notes))
+        notes_times = tuple(itertools.chain.from_iterable(map(operator.attrgetter('start_time', 'end_time'), notes)))
+        unique_notes_times = unique_notes_times_by_pitches.setdefault(pitches, [])
+        if not any(all(map(float_equal, notes_times, other_notes_times)) for other_notes_times in unique_notes_times):
+            unique_notes_times.append(notes_times)
+            unique_note_sequences_list.append(note_sequence)
     return unique_note_sequences_list
 
 
@@ -407,7 +539,7 @@ def float_less(a: float, b: float, rel_tol=constants.FLOAT_RELATIVE_TOLERANCE,
     Returns:
         (bool): True if a < b within the specified tolerance, False otherwise.
     """
-    return not float_equal(a, b, rel_tol, abs_tol) and a < b
+    return a < b and not math.isclose(a, b, rel_tol=rel_tol, abs_tol=abs_tol)
 
 
 def float_great(a: float, b: float, rel_tol=constants.FLOAT_RELATIVE_TOLERANCE,
@@ -423,7 +555,7 @@ def float_great(a: float, b: float, rel_tol=constants.FLOAT_RELATIVE_TOLERANCE,
     Returns:
         (bool): True if a > b within the specified tolerance, False otherwise.
     """
-    return not float_equal(a, b, rel_tol, abs_tol) and a > b
+    return a > b and not math.isclose(a, b, rel_tol=rel_tol, abs_tol=abs_tol)
 
 
 def float_less_or_equal(a: float, b: float, rel_tol=constants.FLOAT_RELATIVE_TOLERANCE,
@@ -440,7 +572,7 @@ def float_less_or_equal(a: float, b: float, rel_tol=constants.FLOAT_RELATIVE_TOL
     Returns:
         (bool): True if a <= b within the specified tolerance, False otherwise.
     """
-    return float_equal(a, b, rel_tol, abs_tol) or a < b
+    return a < b or math.isclose(a, b, rel_tol=rel_tol, abs_tol=abs_tol)
 
 
 def float_great_or_equal(a: float, b: float, rel_tol=constants.FLOAT_RELATIVE_TOLERANCE,
@@ -457,7 +589,28 @@ def float_great_or_equal(a: float, b: float, rel_tol=constants.FLOAT_RELATIVE_TO
     Returns:
         (bool): True if a >= b within the specified tolerance, False otherwise.
     """
-    return float_equal(a, b, rel_tol, abs_tol) or a > b
+    return a > b or math.isclose(a, b, rel_tol=rel_tol, abs_tol=abs_tol)
+
+
+def bisect_float_left(sorted_values: List[float], value: float, rel_tol=constants.FLOAT_RELATIVE_TOLERANCE,
+                      abs_tol=constants.FLOAT_ABSOLUTE_TOLERANCE) -> int:
+    """ Find the index of the first value of a sorted list that is greater than or approximately equal to a given
+    value. All the values before the index are less than the given value according to float_less.
+
+    Args:
+        sorted_values (List[float]): A list of floating point numbers sorted in ascending order.
+        value (float): The floating point number to locate.
+        rel_tol (float): The relative tolerance parameter for the comparison.
+        abs_tol (float): The absolute tolerance parameter for the comparison.
+
+    Returns:
+        (int): The index of the first value in sorted_values that is >= value within the specified tolerance, or the
+            length of sorted_values if there is none.
+    """
+    idx = bisect.bisect_left(sorted_values, value)
+    while idx > 0 and float_equal(sorted_values[idx - 1], value, rel_tol, abs_tol):
+        idx -= 1
+    return idx
 
 
 # ---------------------------------------- DATA ----------------------------------------
@@ -465,18 +618,42 @@ def float_great_or_equal(a: float, b: float, rel_tol=constants.FLOAT_RELATIVE_TO
 U = TypeVar('U')
 
 
-def uniquify_unhashable_obj_list(unhashable_obj_list: List[U], equal_fn: Callable[[U, U], bool]) -> List[U]:
+def uniquify_unhashable_obj_list(unhashable_obj_list: List[U], equal_fn: Callable[[U, U], bool] = None,
+                                 key_fn: Callable[[U], Hashable] = None) -> List[U]:
     """ Remove duplicate objects from a list while preserving the order.
+    If key_fn is given, two objects are equal if they have the same key and each object is checked with a single hash
+    table lookup. Otherwise, each object is compared with equal_fn to all the unique objects found before it.
 
     Args:
         unhashable_obj_list (List[U]): The list containing unhashable objects.
-        equal_fn (Callable[[U, U], bool]): A function that compares two objects for equality.
+        equal_fn (Callable[[U, U], bool]): A function that compares two objects for equality. Ignored if key_fn is
+            given.
+        key_fn (Callable[[U], Hashable]): A function that returns a hashable key of an object, such that two objects
+            are equal if and only if their keys are equal.
 
     Returns:
         List[U]: A list of unique objects from the input list.
+
+    Raises:
+        ValueError: If neither equal_fn nor key_fn is given.
     """
+    if key_fn is not None:
+        # The first object with a given key is kept, and dicts preserve the insertion order
+        unique_objs_by_key = {}
+        for obj in unhashable_obj_list:
+            unique_objs_by_key.setdefault(key_fn(obj), obj)
+        return list(unique_objs_by_key.values())
+    if equal_fn is None:
+        raise ValueError('Either equal_fn or key_fn must be given.')
+
     unique_objs = []
     for obj in unhashable_obj_list:
         if not any(equal_fn(obj, existing_obj) for existing_obj in unique_objs):
             unique_objs.append(obj)
     return unique_objs
+
+
+def _steps_per_bar(steps_per_quarter: int, time_signature: NoteSequence.TimeSignature) -> float:
+    # Same arithmetic (and order of operations) of quarters_per_bar_in_quantized_sequence, without its assert
+    quarters_per_bar = 4.0 / time_signature.denominator * time_signature.numerator
+    return steps_per_quarter * quarters_per_bar
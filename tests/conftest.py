@@ -0,0 +1 @@
+""" The tests directory is added to the import path by pytest, so that the tests can import testing_utilities. """
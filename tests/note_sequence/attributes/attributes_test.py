@@ -0,0 +1,54 @@
+import unittest
+from pathlib import Path
+
+from resolv_mir.note_sequence import attributes
+from resolv_mir.note_sequence.io import midi_io
+from resolv_mir.note_sequence.processors import quantizer
+
+
+class AttributesTest(unittest.TestCase):
+
+    @property
+    def test_file_path(self) -> Path:
+        return Path("./data/4bar_monophonic_melody.mid")
+
+    def setUp(self):
+        note_sequence = midi_io.midi_file_to_note_sequence(self.test_file_path)
+        self.quantized_sequence = quantizer.quantize_note_sequence(note_sequence, steps_per_quarter=4)
+        # Distinct velocities, so that the non-binary attributes differ from the binary ones
+        for idx, note in enumerate(self.quantized_sequence.notes):
+            note.velocity = 40 + 7 * idx
+
+    def test_compute_attributes_batch(self):
+        attributes_values = attributes.compute_attributes_batch(self.quantized_sequence)
+        self.assertEqual(list(attributes_values), list(attributes.ATTRIBUTE_FN_MAP))
+        for attribute_name, attribute_value in attributes_values.items():
+            with self.subTest(attribute_name=attribute_name):
+                self.assertEqual(attribute_value,
+                                 attributes.compute_attribute(self.quantized_sequence, attribute_name))
+
+    def test_compute_attributes_batch_ngrams_kwargs(self):
+        # The n-grams wrappers declare the arguments of ratio_unique_ngrams, including the shared context
+        attributes_values = attributes.compute_attributes_batch(
+            self.quantized_sequence, attribute_names=['unique_bigrams_ratio', 'unique_trigrams_ratio'],
+            unique_bigrams_ratio={'num_midi_pitches': 128}, unique_trigrams_ratio={'num_midi_pitches': 128})
+        self.assertEqual(attributes_values,
+                         {name: attributes.compute_attribute(self.quantized_sequence, name, num_midi_pitches=128)
+                          for name in ('unique_bigrams_ratio', 'unique_trigrams_ratio')})
+
+    def test_compute_attributes_batch_with_kwargs(self):
+        attributes_kwargs = {'toussaint': {'bars': 8, 'binary': False}, 'note_density': {'binary': False}}
+        attributes_values = attributes.compute_attributes_batch(self.quantized_sequence,
+                                                                attribute_names=['toussaint', 'note_density',
+                                                                                 'pitch_range'],
+                                                                **attributes_kwargs)
+        self.assertEqual(attributes_values,
+                         {'toussaint': attributes.compute_attribute(self.quantized_sequence, 'toussaint',
+                                                                    bars=8, binary=False),
+                          'note_density': attributes.compute_attribute(self.quantized_sequence, 'note_density',
+                                                                       binary=False),
+                          'pitch_range': attributes.compute_attribute(self.quantized_sequence, 'pitch_range')})
+
+
+if __name__ == '__main__':
+    unittest.main()
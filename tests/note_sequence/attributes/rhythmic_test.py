@@ -0,0 +1,78 @@
+import unittest
+
+from resolv_mir.note_sequence.attributes import rhythmic
+from resolv_mir.protobuf import NoteSequence
+
+import testing_utilities
+
+
+def _quantized_sequence(steps_velocities, total_quantized_steps: int = 16) -> NoteSequence:
+    # A one step note for each (start_step, velocity) pair
+    return testing_utilities.quantized_sequence([(step, step + 1) for step, _ in steps_velocities],
+                                                total_quantized_steps,
+                                                velocities=[velocity for _, velocity in steps_velocities])
+
+
+class ToussaintTest(unittest.TestCase):
+
+    def setUp(self):
+        self.quantized_sequence = _quantized_sequence([(0, 118), (4, 101), (6, 107), (7, 39), (8, 124), (13, 62)])
+
+    def test_toussaint_non_binary(self):
+        # The expected values are the ones of the dense formulation, which sums the weighted velocities of all pulses
+        self.assertEqual(rhythmic.toussaint(self.quantized_sequence, binary=False), 5.5826771653543314)
+        self.assertEqual(rhythmic.toussaint(self.quantized_sequence, bars=2, binary=False), 12.708661417322835)
+        self.assertEqual(rhythmic.toussaint_batch([self.quantized_sequence], bars=2, binary=False).tolist(),
+                         [12.708661417322835])
+
+    def test_toussaint_batch(self):
+        quantized_sequences = [self.quantized_sequence,
+                               _quantized_sequence([]),
+                               # Notes starting on the same step, of which only the last velocity is considered
+                               _quantized_sequence([(2, 30), (2, 90), (5, 64), (12, 100), (12, 20)]),
+                               _quantized_sequence([(1, 50), (9, 70), (17, 110), (30, 15)], total_quantized_steps=32)]
+        for kwargs in ({}, {'binary': False}, {'bars': 2}, {'bars': 2, 'binary': False}):
+            with self.subTest(**kwargs):
+                self.assertEqual(rhythmic.toussaint_batch(quantized_sequences, **kwargs).tolist(),
+                                 [rhythmic.toussaint(quantized_sequence, **kwargs)
+                                  for quantized_sequence in quantized_sequences])
+
+    def test_toussaint_from_arrays(self):
+        quantized_sequence = _quantized_sequence([(2, 30), (2, 90), (5, 64), (12, 100), (12, 20)])
+        start_steps = [note.quantized_start_step for note in quantized_sequence.notes]
+        velocities = [note.velocity for note in quantized_sequence.notes]
+        for bars in (1, 2):
+            with self.subTest(bars=bars):
+                self.assertEqual(rhythmic.toussaint_from_arrays(start_steps, bars),
+                                 rhythmic.toussaint(quantized_sequence, bars=bars))
+                self.assertEqual(rhythmic.toussaint_from_arrays(start_steps, bars, velocities=velocities),
+                                 rhythmic.toussaint(quantized_sequence, bars=bars, binary=False))
+        self.assertEqual(rhythmic.toussaint_from_arrays([], 1), 0.0)
+
+    def test_toussaint_too_many_onsets(self):
+        quantized_sequence = _quantized_sequence([])
+        # 17 distinct onset times, quantized to the first steps of the bar
+        for idx in range(17):
+            start_time = idx * 0.05
+            quantized_sequence.notes.add(pitch=60, velocity=80, start_time=start_time, end_time=start_time + 0.05,
+                                         quantized_start_step=int(start_time / 0.125),
+                                         quantized_end_step=int(start_time / 0.125) + 1)
+        # The 17 onsets do not fit in the 16 steps of a single bar
+        with self.assertRaises(ValueError):
+            rhythmic.toussaint(quantized_sequence, bars=1)
+        with self.assertRaises(ValueError):
+            rhythmic.toussaint_batch([quantized_sequence], bars=1, binary=False)
+        self.assertEqual(rhythmic.toussaint(quantized_sequence, bars=2), 30.0)
+
+
+class NoteDensityTest(unittest.TestCase):
+
+    def test_note_density_non_binary(self):
+        quantized_sequence = _quantized_sequence([(0, 118), (4, 101), (6, 107), (7, 39), (8, 124), (13, 62)])
+        # The expected values are the ones of the sum of the normalized velocities
+        self.assertEqual(rhythmic.note_density(quantized_sequence, binary=False), 0.2711614173228346)
+        self.assertEqual(rhythmic.note_density(quantized_sequence, bars=2, binary=False), 0.1355807086614173)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+
+import numpy as np
+
+from resolv_mir.note_sequence.chord_symbols import constants, transposer
+
+
+class ChordSymbolsTransposerTest(unittest.TestCase):
+
+    @property
+    def figures(self):
+        return ['C', 'Am7', 'F#m7b5/C#', 'Bb7(#9)', 'Ebmaj7', 'G/B', 'C', 'Dbdim', 'E##', 'Fbb7/Abb']
+
+    @property
+    def transpose_amounts(self):
+        return range(-25, 26)
+
+    def test_transpose_chord_symbols_batch(self):
+        for transpose_amount in self.transpose_amounts:
+            with self.subTest(transpose_amount=transpose_amount):
+                self.assertEqual(transposer.transpose_chord_symbols_batch(self.figures, transpose_amount),
+                                 [transposer.transpose_chord_symbol(figure, transpose_amount)
+                                  for figure in self.figures])
+
+    def test_transpose_pitch_class_batch(self):
+        steps = sorted(constants.STEPS_ABOVE)
+        pitch_classes = [(step, alter) for step in steps for alter in range(-9, 10)]
+        steps_idx = np.array([steps.index(step) for step, _ in pitch_classes])
+        alters = np.array([alter for _, alter in pitch_classes])
+        for transpose_amount in self.transpose_amounts:
+            with self.subTest(transpose_amount=transpose_amount):
+                transposed_steps, transposed_alters = transposer.transpose_pitch_class_batch(steps_idx, alters,
+                                                                                             transpose_amount)
+                self.assertEqual([(steps[step], alter) for step, alter in zip(transposed_steps.tolist(),
+                                                                              transposed_alters.tolist())],
+                                 [transposer.transpose_pitch_class(step, alter, transpose_amount)
+                                  for step, alter in pitch_classes])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from resolv_mir.note_sequence.io import midi_io
+
+
+class MidiIOTest(unittest.TestCase):
+
+    @property
+    def input_dir(self) -> Path:
+        return Path("./data")
+
+    @property
+    def test_file_paths(self):
+        return sorted(self.input_dir.rglob("*.mid*"))
+
+    # symusic represents times in seconds as 32-bit floats
+    TIME_DELTA = 1e-5
+
+    def assertTimesAlmostEqual(self, times, other_times):
+        self.assertEqual(len(times), len(other_times))
+        for time, other_time in zip(np.ravel(times), np.ravel(other_times)):
+            self.assertAlmostEqual(time, other_time, delta=self.TIME_DELTA)
+
+    def test_midi_files_to_note_sequences(self):
+        note_sequences = list(midi_io.midi_files_to_note_sequences(self.test_file_paths, n_workers=2, chunksize=2))
+        self.assertEqual(note_sequences, [midi_io.midi_file_to_note_sequence(test_file_path)
+                                          for test_file_path in self.test_file_paths])
+
+    @unittest.skipIf(midi_io.symusic is None, "symusic is not installed")
+    def test_symusic_backend_parity(self):
+        for test_file_path in self.test_file_paths:
+            with self.subTest(test_file_path=test_file_path):
+                note_sequence = midi_io.midi_file_to_note_sequence(test_file_path, backend='pretty_midi')
+                symusic_note_sequence = midi_io.midi_file_to_note_sequence(test_file_path, backend='symusic')
+                self.assertAlmostEqual(note_sequence.total_time, symusic_note_sequence.total_time,
+                                       delta=self.TIME_DELTA)
+                self.assertEqual([(n.instrument, n.program, n.is_drum, n.pitch, n.velocity)
+                                  for n in note_sequence.notes],
+                                 [(n.instrument, n.program, n.is_drum, n.pitch, n.velocity)
+                                  for n in symusic_note_sequence.notes])
+                self.assertTimesAlmostEqual([(n.start_time, n.end_time) for n in note_sequence.notes],
+                                            [(n.start_time, n.end_time) for n in symusic_note_sequence.notes])
+                self.assertEqual([t.qpm for t in note_sequence.tempos], [t.qpm for t in symusic_note_sequence.tempos])
+                self.assertTimesAlmostEqual([t.time for t in note_sequence.tempos],
+                                            [t.time for t in symusic_note_sequence.tempos])
+                self.assertEqual([(k.key, k.mode) for k in note_sequence.key_signatures],
+                                 [(k.key, k.mode) for k in symusic_note_sequence.key_signatures])
+                self.assertTimesAlmostEqual([k.time for k in note_sequence.key_signatures],
+                                            [k.time for k in symusic_note_sequence.key_signatures])
+                self.assertEqual([(t.numerator, t.denominator) for t in note_sequence.time_signatures],
+                                 [(t.numerator, t.denominator) for t in symusic_note_sequence.time_signatures])
+                self.assertTimesAlmostEqual([t.time for t in note_sequence.time_signatures],
+                                            [t.time for t in symusic_note_sequence.time_signatures])
+
+
+if __name__ == '__main__':
+    unittest.main()
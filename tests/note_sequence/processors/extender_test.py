@@ -0,0 +1,27 @@
+import unittest
+
+from resolv_mir.note_sequence.processors import extender
+
+import testing_utilities
+
+
+class ExtenderTest(unittest.TestCase):
+
+    def test_extend_with_silence(self):
+        note_sequence = testing_utilities.quantized_sequence([(0, 8), (8, 20)], total_quantized_steps=20)
+        extender.extend_quantized_sequence_with_silence(note_sequence)
+        self.assertEqual(note_sequence.total_quantized_steps, 32)
+        self.assertEqual(note_sequence.total_time, 4.0)
+        silence = note_sequence.notes[-1]
+        self.assertEqual((silence.quantized_start_step, silence.quantized_end_step), (20, 32))
+        self.assertEqual((silence.start_time, silence.end_time, silence.velocity), (2.5, 4.0, 0))
+
+    def test_extend_on_bar_boundary(self):
+        note_sequence = testing_utilities.quantized_sequence([(0, 8), (8, 32)], total_quantized_steps=32)
+        extender.extend_quantized_sequence_with_silence(note_sequence)
+        self.assertEqual(len(note_sequence.notes), 2)
+        self.assertEqual(note_sequence.total_quantized_steps, 32)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+from pathlib import Path
+
+from resolv_mir.note_sequence.io import midi_io
+from resolv_mir.note_sequence.processors import extractor, quantizer, sustainer
+from resolv_mir.protobuf import NoteSequence
+
+import testing_utilities
+
+
+class ExtractSubsequencesTest(unittest.TestCase):
+
+    def test_pedal_change_on_split_boundary(self):
+        note_sequence = testing_utilities.note_sequence([(0.0, 0.25), (1.0, 1.25), (2.0, 2.5), (3.0, 3.5)],
+                                                        total_time=4.0)
+        note_sequence.control_changes.add(time=0.0, control_number=64, control_value=127)
+        note_sequence.control_changes.add(time=0.5, control_number=64, control_value=0)
+        note_sequence.control_changes.add(time=2.0, control_number=64, control_value=127)
+        _, subsequence = extractor.extract_subsequences(note_sequence, [(0.0, 2.0), (2.0, 4.0)])
+        # The pedal pressed on the boundary replaces the released state carried over from the previous interval
+        self.assertEqual([(cc.time, cc.control_value) for cc in subsequence.control_changes], [(0.0, 127)])
+        sustained_subsequence = sustainer.apply_sustain_control_changes(subsequence)
+        self.assertEqual([(note.start_time, note.end_time) for note in sustained_subsequence.notes],
+                         [(0.0, 1.0), (1.0, 1.5)])
+
+    def test_pedal_state_before_interval_events(self):
+        note_sequence = testing_utilities.note_sequence([(0.0, 0.25), (2.0, 2.25)], total_time=4.0)
+        note_sequence.control_changes.add(time=0.0, control_number=64, control_value=127)
+        note_sequence.control_changes.add(time=2.5, control_number=64, control_value=0)
+        _, subsequence = extractor.extract_subsequences(note_sequence, [(0.0, 1.0), (1.0, 4.0)])
+        self.assertEqual([(cc.time, cc.control_value) for cc in subsequence.control_changes], [(0.0, 127), (1.5, 0)])
+        sustained_subsequence = sustainer.apply_sustain_control_changes(subsequence)
+        self.assertEqual([(note.start_time, note.end_time) for note in sustained_subsequence.notes], [(1.0, 1.5)])
+
+    def test_text_annotations(self):
+        annotation_types = NoteSequence.TextAnnotation
+        note_sequence = testing_utilities.note_sequence([(0.0, 0.5), (1.0, 1.5), (2.0, 2.5), (3.0, 3.5)],
+                                                        total_time=4.0)
+        note_sequence.text_annotations.add(time=0.0, text='C', annotation_type=annotation_types.CHORD_SYMBOL)
+        note_sequence.text_annotations.add(time=3.0, text='G7', annotation_type=annotation_types.CHORD_SYMBOL)
+        for time in (0.0, 1.0, 2.0, 3.0):
+            note_sequence.text_annotations.add(time=time, annotation_type=annotation_types.BEAT)
+        # Other text annotations are not copied to the subsequences
+        note_sequence.text_annotations.add(time=1.0, text='x', annotation_type=annotation_types.UNKNOWN)
+        subsequences = extractor.extract_subsequences(note_sequence, [(0.0, 2.0), (2.0, 4.0)])
+        self.assertEqual([[(a.time, a.text, a.annotation_type) for a in subsequence.text_annotations]
+                          for subsequence in subsequences],
+                         [[(0.0, 'C', annotation_types.CHORD_SYMBOL),
+                           (0.0, '', annotation_types.BEAT),
+                           (1.0, '', annotation_types.BEAT)],
+                          [(1.0, 'G7', annotation_types.CHORD_SYMBOL),
+                           (0.0, '', annotation_types.BEAT),
+                           (1.0, '', annotation_types.BEAT)]])
+
+
+class ExtractMelodyTest(unittest.TestCase):
+
+    @property
+    def test_file_path(self) -> Path:
+        return Path("./data/4bar_monophonic_melody.mid")
+
+    def test_text_annotations(self):
+        note_sequence = midi_io.midi_file_to_note_sequence(self.test_file_path)
+        quantized_sequence = quantizer.quantize_note_sequence(note_sequence, steps_per_quarter=4)
+        quantized_sequence.text_annotations.add(time=1.0, text='C',
+                                                annotation_type=NoteSequence.TextAnnotation.CHORD_SYMBOL)
+        quantized_sequence.text_annotations.add(time=quantized_sequence.total_time + 1.0, text='G',
+                                                annotation_type=NoteSequence.TextAnnotation.CHORD_SYMBOL)
+        melody = extractor.extract_melody_from_note_sequence(quantized_sequence)
+        self.assertEqual(len(melody.notes), len(note_sequence.notes))
+        # Only the annotations in the melody interval are copied, and only to the text annotations
+        self.assertEqual([(a.time, a.text) for a in melody.text_annotations], [(1.0, 'C')])
+        self.assertFalse(melody.pitch_bends)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,7 @@ from pathlib import Path
 
 from resolv_mir.note_sequence.io import midi_io
 from resolv_mir.note_sequence.processors import slicer, quantizer
+from resolv_mir.protobuf import NoteSequence
 
 
 class SlicerTest(unittest.TestCase):
@@ -22,6 +23,18 @@ class SlicerTest(unittest.TestCase):
     def setUp(self):
         self.output_dir.mkdir(parents=True, exist_ok=True)
 
+    def test_slice_skip_splits_inside_notes(self):
+        note_sequence = NoteSequence(total_time=4.0)
+        for start_time, end_time in ((0.0, 0.5), (1.5, 2.5), (3.0, 3.5)):
+            note_sequence.notes.add(pitch=60, velocity=80, start_time=start_time, end_time=end_time)
+        slices = slicer.slice_note_sequence(note_sequence, slice_size_seconds=1.0, hop_size_seconds=1.0,
+                                            skip_splits_inside_notes=True)
+        # Only the slice starting inside the second note is skipped. The notes that ended before a slice start do not
+        # prevent the slice.
+        self.assertEqual([(s.subsequence_info.start_time_offset, [(n.start_time, n.end_time) for n in s.notes])
+                          for s in slices],
+                         [(0.0, [(0.0, 0.5)]), (1.0, [(0.5, 1.0)]), (3.0, [(0.0, 0.5)])])
+
 
 if __name__ == '__main__':
     unittest.main()
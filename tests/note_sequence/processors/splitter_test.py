@@ -0,0 +1,60 @@
+import unittest
+
+from resolv_mir.note_sequence.processors import splitter
+
+import testing_utilities
+
+
+class SplitterTest(unittest.TestCase):
+
+    @staticmethod
+    def _subsequences_notes(subsequences):
+        return [(subsequence.subsequence_info.start_time_offset,
+                 [(note.start_time, note.end_time) for note in subsequence.notes]) for subsequence in subsequences]
+
+    def test_split_truncates_notes(self):
+        note_sequence = testing_utilities.note_sequence([(0.0, 0.5), (0.75, 1.5), (2.25, 2.5)], total_time=3.0)
+        subsequences = splitter.split_note_sequence(note_sequence, 1.0, skip_splits_inside_notes=False)
+        self.assertEqual(self._subsequences_notes(subsequences),
+                         [(0.0, [(0.0, 0.5), (0.75, 1.0)]), (2.0, [(0.25, 0.5)])])
+
+    def test_split_skip_splits_inside_notes(self):
+        note_sequence = testing_utilities.note_sequence([(0.0, 0.5), (0.75, 1.5), (2.25, 2.5)], total_time=3.0)
+        subsequences = splitter.split_note_sequence(note_sequence, 1.0, skip_splits_inside_notes=True)
+        # The split at 1.0 is inside the second note, so the intervals around it are merged and no note is lost
+        self.assertEqual(self._subsequences_notes(subsequences),
+                         [(0.0, [(0.0, 0.5), (0.75, 1.5)]), (2.0, [(0.25, 0.5)])])
+
+    def test_split_skip_all_splits_inside_notes(self):
+        note_sequence = testing_utilities.note_sequence([(0.0, 2.5), (0.75, 1.5)], total_time=3.0)
+        subsequences = splitter.split_note_sequence(note_sequence, 1.0, skip_splits_inside_notes=True)
+        self.assertEqual(subsequences, [note_sequence])
+
+    def test_split_skip_splits_at_note_end(self):
+        note_sequence = testing_utilities.note_sequence([(0.0, 1.0), (1.0, 2.0)], total_time=2.0)
+        subsequences = splitter.split_note_sequence(note_sequence, [1.0], skip_splits_inside_notes=True)
+        # A note ending on a split time is not sustained across it
+        self.assertEqual(self._subsequences_notes(subsequences), [(0.0, [(0.0, 1.0)]), (1.0, [(0.0, 1.0)])])
+
+    def test_split_repeated_split_points(self):
+        note_sequence = testing_utilities.note_sequence([(0.0, 0.5), (1.0, 1.5), (2.0, 2.5)], total_time=3.0)
+        subsequences = splitter.split_note_sequence(note_sequence, [2.0, 1.0, 1.0, 2.0 + 1e-12, 1.0 - 1e-12, 5.0])
+        # Each distinct split point is used once, so there is one subsequence (with its note) per split interval
+        self.assertEqual([len(subsequence.notes) for subsequence in subsequences], [1, 1, 1])
+        for subsequence, start_time in zip(subsequences, [0.0, 1.0, 2.0]):
+            self.assertAlmostEqual(subsequence.subsequence_info.start_time_offset, start_time)
+
+    def test_split_on_silence(self):
+        note_sequence = testing_utilities.note_sequence([(0.0, 1.0), (5.0, 6.0), (10.0, 11.0)], total_time=11.0)
+        subsequences = splitter.split_note_sequence_on_silence(note_sequence, gap_seconds=3.0)
+        self.assertEqual(self._subsequences_notes(subsequences),
+                         [(0.0, [(0.0, 1.0)]), (5.0, [(0.0, 1.0)]), (10.0, [(0.0, 1.0)])])
+
+    def test_split_on_silence_without_gaps(self):
+        note_sequence = testing_utilities.note_sequence([(0.0, 1.0), (3.0, 6.0), (8.0, 11.0)], total_time=11.0)
+        subsequences = splitter.split_note_sequence_on_silence(note_sequence, gap_seconds=3.0)
+        self.assertEqual(subsequences, [note_sequence])
+
+
+if __name__ == '__main__':
+    unittest.main()
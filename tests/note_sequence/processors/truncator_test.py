@@ -0,0 +1,27 @@
+import unittest
+
+from resolv_mir.note_sequence.processors import truncator
+
+import testing_utilities
+
+
+class TruncatorTest(unittest.TestCase):
+
+    def test_truncate_at_step(self):
+        note_sequence = testing_utilities.quantized_sequence([(0, 4), (4, 12), (12, 16), (10, 14), (16, 20)],
+                                                             total_quantized_steps=20)
+        truncated_sequence = truncator.truncate_quantized_sequence_at_step(note_sequence, 10)
+        # Notes crossing the end step are shortened and the ones starting at or after it are removed
+        self.assertEqual([(n.quantized_start_step, n.quantized_end_step, n.start_time, n.end_time)
+                          for n in truncated_sequence.notes], [(0, 4, 0.0, 0.5), (4, 10, 0.5, 1.25)])
+
+    def test_truncate_at_bar(self):
+        note_sequence = testing_utilities.quantized_sequence([(0, 8), (8, 24), (16, 40), (36, 40)],
+                                                             total_quantized_steps=40)
+        truncated_sequence = truncator.truncate_quantized_sequence_at_bar(note_sequence, 2)
+        self.assertEqual([(n.quantized_start_step, n.quantized_end_step, n.end_time)
+                          for n in truncated_sequence.notes], [(0, 8, 1.0), (8, 24, 3.0), (16, 32, 4.0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+
+import numpy as np
+
+from resolv_mir.note_sequence import utilities
+from resolv_mir.protobuf import NoteSequence
+
+import testing_utilities
+
+
+class NotePitchesHistogramTest(unittest.TestCase):
+
+    @staticmethod
+    def _note_sequence(pitches) -> NoteSequence:
+        # A half second note for each pitch
+        return testing_utilities.note_sequence([(idx * 0.5, (idx + 1) * 0.5) for idx in range(len(pitches))],
+                                               total_time=len(pitches) * 0.5, pitches=pitches)
+
+    def setUp(self):
+        self.note_sequences = [self._note_sequence([60, 64, 67, 72, 61]),
+                               self._note_sequence([]),
+                               # Pitches below the MIDI range are not counted
+                               self._note_sequence([-1, 0, 11, 127, -13]),
+                               self._note_sequence([48, 48, 50])]
+
+    def test_get_note_pitches_histograms_for_note_sequences(self):
+        histograms = utilities.get_note_pitches_histograms_for_note_sequences(self.note_sequences)
+        self.assertEqual(histograms.shape, (len(self.note_sequences), 12))
+        self.assertEqual(histograms.tolist(),
+                         [utilities.get_note_pitches_histogram_for_note_sequence(note_sequence).tolist()
+                          for note_sequence in self.note_sequences])
+        self.assertEqual(utilities.get_note_pitches_histograms_for_note_sequences([]).shape, (0, 12))
+
+    def test_get_note_pitches_histogram_for_note_sequence_out(self):
+        # The same buffer is reused for all the sequences and its previous content is overwritten
+        out = np.full(12, -1, dtype=np.int64)
+        for note_sequence in self.note_sequences:
+            with self.subTest(pitches=[note.pitch for note in note_sequence.notes]):
+                histogram = utilities.get_note_pitches_histogram_for_note_sequence(note_sequence, out=out)
+                self.assertIs(histogram, out)
+                self.assertEqual(out.tolist(),
+                                 utilities.get_note_pitches_histogram_for_note_sequence(note_sequence).tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
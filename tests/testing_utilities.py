@@ -0,0 +1,40 @@
+""" This module provides builders of small synthetic NoteSequence protos shared by the tests. """
+from typing import Sequence, Tuple
+
+from resolv_mir.protobuf import NoteSequence
+
+# The quantized sequences are in 4/4 at 120 qpm with 4 steps per quarter, i.e. 16 steps per bar and 8 steps per second
+STEPS_PER_SECOND = 8
+
+
+def note_sequence(notes_times: Sequence[Tuple[float, float]], total_time: float, pitches: Sequence[int] = None,
+                  velocities: Sequence[int] = None) -> NoteSequence:
+    """ Builds a NoteSequence proto with a note for each (start_time, end_time) pair.
+
+    The notes have pitch 60 and velocity 80, unless their pitches or velocities are given.
+    """
+    sequence = NoteSequence(total_time=total_time)
+    for idx, (start_time, end_time) in enumerate(notes_times):
+        sequence.notes.add(pitch=pitches[idx] if pitches else 60, velocity=velocities[idx] if velocities else 80,
+                           start_time=start_time, end_time=end_time)
+    return sequence
+
+
+def quantized_sequence(notes_steps: Sequence[Tuple[int, int]], total_quantized_steps: int,
+                       pitches: Sequence[int] = None, velocities: Sequence[int] = None) -> NoteSequence:
+    """ Builds a NoteSequence proto quantized relative to tempo with a note for each (start_step, end_step) pair.
+
+    The notes have pitch 60 and velocity 80, unless their pitches or velocities are given.
+    """
+    sequence = note_sequence([(start_step / STEPS_PER_SECOND, end_step / STEPS_PER_SECOND)
+                              for start_step, end_step in notes_steps],
+                             total_time=total_quantized_steps / STEPS_PER_SECOND, pitches=pitches,
+                             velocities=velocities)
+    sequence.total_quantized_steps = total_quantized_steps
+    sequence.quantization_info.steps_per_quarter = 4
+    sequence.time_signatures.add(numerator=4, denominator=4)
+    sequence.tempos.add(qpm=120)
+    for note, (start_step, end_step) in zip(sequence.notes, notes_steps):
+        note.quantized_start_step = start_step
+        note.quantized_end_step = end_step
+    return sequence